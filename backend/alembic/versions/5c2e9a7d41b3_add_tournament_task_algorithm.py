@@ -0,0 +1,26 @@
+"""Add tournament task algorithm
+
+Revision ID: 5c2e9a7d41b3
+Revises: 1aa88224b332
+Create Date: 2026-10-19 10:12:31.480512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e9a7d41b3'
+down_revision: Union[str, None] = '1aa88224b332'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tournament_tasks', sa.Column('algorithm', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('tournament_tasks', 'algorithm')
@@ -0,0 +1,151 @@
+"""
+Admission control for CPU-heavy design generation.
+
+Each ``AdmissionLimiter`` lets a fixed number of requests generate designs
+at once and queues a bounded number more. A request that finds the queue
+full, or waits longer than the queue timeout, is shed at once with
+``503 Service Unavailable`` and a ``Retry-After`` header instead of waiting
+behind work it would time out on anyway. Requests that never generate a
+design (cached or stored tasks, ``/health``, recording responses) never
+touch a limiter.
+"""
+
+import asyncio
+import collections
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+
+from fastapi import HTTPException
+
+from . import config
+from .metrics import Counter, Gauge
+
+_admitted = Counter("acbc_admission_admitted_total", "Requests admitted to design generation.", ("endpoint",))
+_shed = Counter(
+    "acbc_admission_shed_total", "Requests rejected with 503 by admission control.", ("endpoint", "reason")
+)
+
+_limiters: Dict[str, "AdmissionLimiter"] = {}
+
+
+class Overloaded(HTTPException):
+    """503 raised when a request is shed; routers re-raise it like any ``HTTPException``."""
+
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"Server is busy generating designs ({endpoint}); retry in {retry_after}s",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded FIFO queue.
+
+    Args:
+        name: Endpoint label used in metrics and errors
+        max_concurrent: Requests allowed to generate designs at once
+        max_queue: Requests allowed to wait for a slot
+        queue_timeout: Longest wait for a slot, in seconds
+        retry_after: ``Retry-After`` sent with a 503, in seconds
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        _limiters[name] = self
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _shed(self, reason: str) -> Overloaded:
+        _shed.inc(endpoint=self.name, reason=reason)
+        return Overloaded(self.name, self.retry_after)
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed; raises ``Overloaded`` when shed."""
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            _admitted.inc(endpoint=self.name)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._shed("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._shed("timeout") from None
+        _admitted.inc(endpoint=self.name)
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without waiting; returns False if none is free or requests are queued."""
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            _admitted.inc(endpoint=self.name)
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give the slot to the next waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot moves to the waiter; _active is unchanged
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold a slot for the duration of the ``async with`` block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+Gauge("acbc_admission_active", "Requests generating designs, per endpoint.", ("endpoint",)).set_function(
+    lambda: {(name,): limiter.active for name, limiter in _limiters.items()}
+)
+Gauge("acbc_admission_queued", "Requests waiting to generate designs, per endpoint.", ("endpoint",)).set_function(
+    lambda: {(name,): limiter.queued for name, limiter in _limiters.items()}
+)
+
+# Single tournament tasks: GET /api/tournament/choice and POST /api/tournament/choice-and-next
+tournament_limiter = AdmissionLimiter(
+    "tournament",
+    config.ADMISSION_TOURNAMENT_CONCURRENCY,
+    config.ADMISSION_TOURNAMENT_QUEUE,
+    config.ADMISSION_QUEUE_TIMEOUT,
+    config.ADMISSION_RETRY_AFTER,
+)
+# Whole tournaments: GET /api/tournament/tasks
+prefetch_limiter = AdmissionLimiter(
+    "prefetch",
+    config.ADMISSION_PREFETCH_CONCURRENCY,
+    config.ADMISSION_PREFETCH_QUEUE,
+    config.ADMISSION_QUEUE_TIMEOUT,
+    config.ADMISSION_RETRY_AFTER,
+)
@@ -0,0 +1,439 @@
+"""
+Caches and cache backends.
+
+A ``Cache`` is a named namespace (session state, generated designs) on top
+of a ``CacheBackend``. The backend is chosen by the ``CACHE_BACKEND``
+setting so that several workers can share one cache:
+
+- ``memory``: per-process LRU with expiry (default)
+- ``shm``: fixed-size table in a named shared-memory segment, shared by the
+  workers of one host
+- ``redis``: any server speaking the Redis protocol
+- ``local``: in-process stand-in for ``redis`` that stores serialized
+  bytes, used to exercise the shared code path in tests
+"""
+
+import asyncio
+import hashlib
+import struct
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from . import config
+from .metrics import Counter, Gauge
+from .serialization import decode_value, encode_value
+
+CACHE_HITS = Counter("acbc_cache_hits_total", "Cache lookups that found a live entry.", ("cache",))
+CACHE_MISSES = Counter("acbc_cache_misses_total", "Cache lookups that found no live entry.", ("cache",))
+CACHE_EVICTIONS = Counter(
+    "acbc_cache_evictions_total",
+    "Entries dropped because the cache was full or the entry expired.",
+    ("backend",),
+)
+CACHE_ERRORS = Counter(
+    "acbc_cache_errors_total",
+    "Backend failures; the lookup is treated as a miss.",
+    ("backend",),
+)
+
+_caches: List["Cache"] = []
+
+
+def _deep_sizeof(value: Any) -> int:
+    """Approximate memory footprint of a JSON-like value in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_sizeof(v) for v in value)
+    return size
+
+
+class TTLCache:
+    """
+    Bounded LRU mapping with per-entry expiry.
+
+    Args:
+        max_entries: Maximum number of entries kept; the least recently used
+            entry is evicted first
+        sizeof: Function returning the size in bytes of a stored value
+    """
+
+    def __init__(self, max_entries: int, sizeof=_deep_sizeof):
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        # key -> (expires_at, size_bytes, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self.memory_bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if key in self._entries:
+            self._remove(key)
+        size = self.sizeof(value)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.memory_bytes += size
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.memory_bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.memory_bytes -= size
+
+
+class CacheBackend:
+    """Key/value store behind one or more ``Cache`` namespaces."""
+
+    name = "base"
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def memory_bytes(self) -> int:
+        """Bytes held by this process for the backend (0 if held elsewhere)."""
+        return 0
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process backend; values are stored as Python objects."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self._store = TTLCache(max_entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._store.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        evictions = self._store.evictions
+        self._store.set(key, value, ttl)
+        CACHE_EVICTIONS.inc(self._store.evictions - evictions, backend=self.name)
+
+    async def delete(self, key: str) -> None:
+        self._store.delete(key)
+
+    def memory_bytes(self) -> int:
+        return self._store.memory_bytes
+
+
+class LocalBackend(MemoryBackend):
+    """
+    In-process stand-in for a shared backend.
+
+    Values go through the same serialization as the ``shm`` and ``redis``
+    backends, so tests catch values that would not survive a shared cache.
+    """
+
+    name = "local"
+
+    def __init__(self, max_entries: int):
+        self._store = TTLCache(max_entries, sizeof=len)
+
+    async def get(self, key: str) -> Optional[Any]:
+        data = self._store.get(key)
+        return decode_value(data) if data is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await super().set(key, encode_value(value), ttl)
+
+
+class SharedMemoryBackend(CacheBackend):
+    """
+    Direct-mapped table in a named shared-memory segment.
+
+    Each key hashes to one fixed-size slot; a write overwrites whatever the
+    slot held. Slots carry a CRC of their payload so that a reader racing a
+    writer in another process sees a miss instead of a torn value, which
+    keeps the table lock-free. Values larger than a slot are not cached.
+
+    Args:
+        segment: Name of the shared-memory segment, identical in all workers
+        slots: Number of slots in the table
+        slot_bytes: Size of each slot including its header
+    """
+
+    name = "shm"
+    # key hash, expiry (wall clock, shared between processes), payload length, payload CRC
+    _HEADER = struct.Struct("<QdII")
+
+    def __init__(self, segment: str, slots: int, slot_bytes: int):
+        from multiprocessing import resource_tracker, shared_memory
+
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        size = slots * slot_bytes
+        try:
+            self._shm = shared_memory.SharedMemory(name=segment, create=True, size=size)
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=segment)
+        # The segment outlives any single worker; keep the resource tracker
+        # from unlinking it when this process exits.
+        try:
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        except Exception:
+            pass
+        self._buf = self._shm.buf
+        self.oversized = 0
+
+    def _locate(self, key: str) -> Tuple[int, int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        key_hash = int.from_bytes(digest, "little") or 1
+        return key_hash, (key_hash % self.slots) * self.slot_bytes
+
+    async def get(self, key: str) -> Optional[Any]:
+        key_hash, offset = self._locate(key)
+        stored_hash, expires_at, length, crc = self._HEADER.unpack_from(self._buf, offset)
+        if stored_hash != key_hash or expires_at < time.time():
+            return None
+        start = offset + self._HEADER.size
+        if length > self.slot_bytes - self._HEADER.size:
+            return None
+        data = bytes(self._buf[start:start + length])
+        if zlib.crc32(data) != crc:
+            return None
+        return decode_value(data)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        data = encode_value(value)
+        if len(data) > self.slot_bytes - self._HEADER.size:
+            self.oversized += 1
+            return
+        key_hash, offset = self._locate(key)
+        start = offset + self._HEADER.size
+        self._buf[start:start + len(data)] = data
+        self._HEADER.pack_into(self._buf, offset, key_hash, time.time() + ttl, len(data), zlib.crc32(data))
+
+    async def delete(self, key: str) -> None:
+        key_hash, offset = self._locate(key)
+        if self._HEADER.unpack_from(self._buf, offset)[0] == key_hash:
+            self._HEADER.pack_into(self._buf, offset, 0, 0.0, 0, 0)
+
+    def memory_bytes(self) -> int:
+        return self._shm.size
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend for servers speaking the Redis protocol (RESP).
+
+    Uses one connection per worker; commands are short, so they are
+    serialized on that connection. Any connection error drops the
+    connection and is reported to the caller as a miss.
+
+    Args:
+        url: ``redis://[:password@]host[:port][/db]``
+        timeout: Seconds to wait for a reply before giving up
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode_command(*args: Any) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    async def _read_reply(self) -> Any:
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            return [await self._read_reply() for _ in range(int(rest))]
+        raise ValueError(f"Unexpected reply from cache server: {line!r}")
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._call_connected("AUTH", self.password)
+        if self.db:
+            await self._call_connected("SELECT", self.db)
+
+    async def _call_connected(self, *args: Any) -> Any:
+        self._writer.write(self._encode_command(*args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _call(self, *args: Any) -> Any:
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await asyncio.wait_for(self._connect(), self.timeout)
+                return await asyncio.wait_for(self._call_connected(*args), self.timeout)
+            except Exception:
+                CACHE_ERRORS.inc(backend=self.name)
+                if self._writer is not None:
+                    self._writer.close()
+                self._reader = self._writer = None
+                return None
+
+    async def get(self, key: str) -> Optional[Any]:
+        data = await self._call("GET", key)
+        return decode_value(data) if data else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._call("SET", key, encode_value(value), "PX", int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self._call("DEL", key)
+
+
+def create_backend(kind: str) -> CacheBackend:
+    """Build the cache backend named by ``kind`` (see module docstring)."""
+    if kind == "memory":
+        return MemoryBackend(config.CACHE_MAX_ENTRIES)
+    if kind == "local":
+        return LocalBackend(config.CACHE_MAX_ENTRIES)
+    if kind == "shm":
+        return SharedMemoryBackend(config.CACHE_SHM_NAME, config.CACHE_SHM_SLOTS, config.CACHE_SHM_SLOT_BYTES)
+    if kind == "redis":
+        return RedisBackend(config.REDIS_URL)
+    raise ValueError(f"Unknown CACHE_BACKEND '{kind}'")
+
+
+_backend: Optional[CacheBackend] = None
+
+
+def get_backend() -> CacheBackend:
+    """The process-wide backend selected by configuration, created on first use."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(config.CACHE_BACKEND)
+    return _backend
+
+
+class Cache:
+    """
+    Named cache namespace with hit/miss accounting.
+
+    Args:
+        name: Namespace, used as key prefix and metrics label
+        ttl: Seconds an entry stays valid after it was written
+        enabled: When False every lookup misses and writes are ignored
+        backend: Backend to use; defaults to the configured one
+    """
+
+    def __init__(self, name: str, ttl: float, enabled: bool = True, backend: Optional[CacheBackend] = None):
+        self.name = name
+        self.ttl = ttl
+        self.enabled = enabled
+        self._backend = backend
+        _caches.append(self)
+
+    @property
+    def backend(self) -> CacheBackend:
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    def _key(self, key: Hashable) -> str:
+        if isinstance(key, tuple):
+            key = ":".join(str(part) for part in key)
+        return f"acbc:{self.name}:{key}"
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None; callers must not mutate it."""
+        value = await self.backend.get(self._key(key)) if self.enabled else None
+        if value is None:
+            CACHE_MISSES.inc(cache=self.name)
+        else:
+            CACHE_HITS.inc(cache=self.name)
+        return value
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        if self.enabled:
+            await self.backend.set(self._key(key), value, self.ttl)
+
+    async def invalidate(self, key: Hashable) -> None:
+        if self.enabled:
+            await self.backend.delete(self._key(key))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and memory usage of the cache."""
+        hits = CACHE_HITS.value(cache=self.name)
+        misses = CACHE_MISSES.value(cache=self.name)
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.enabled else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+def _hit_ratios() -> Dict[Tuple[str, ...], float]:
+    return {(cache.name,): cache.stats()["hit_rate"] for cache in _caches}
+
+
+def _memory_bytes() -> Dict[Tuple[str, ...], float]:
+    backend = _backend
+    return {(backend.name,): backend.memory_bytes()} if backend is not None else {}
+
+
+Gauge("acbc_cache_hit_ratio", "Share of lookups served from the cache.", ("cache",)).set_function(_hit_ratios)
+Gauge(
+    "acbc_cache_memory_bytes",
+    "Approximate memory held by the cache backend in this process.",
+    ("backend",),
+).set_function(_memory_bytes)
@@ -0,0 +1,252 @@
+"""
+Response size reduction for mobile respondents.
+
+``CompressionMiddleware`` negotiates ``Content-Encoding`` (brotli when the
+``brotli`` package is installed, otherwise gzip) for text responses above a
+size threshold. Streamed responses such as NDJSON progress are compressed
+chunk by chunk and flushed, so progress lines still arrive as they are
+produced.
+
+Clients can also ask for the compact design format with ``?format=compact``
+or ``Accept: application/vnd.acbc.compact+json``. It sends the attribute
+names and levels once and each concept as a tuple of level indexes.
+"""
+
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPACT_MEDIA_TYPE = "application/vnd.acbc.compact+json"
+
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/vnd.acbc", "text/")
+
+
+def wants_compact(request: Request) -> bool:
+    """Whether the client asked for the compact design format."""
+    return (
+        request.query_params.get("format") == "compact"
+        or COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+    )
+
+
+def compact_concepts(concept_lists: List[List[Dict[str, Any]]]) -> Tuple[List[str], List[List[Any]], List[List[List[int]]]]:
+    """
+    Encode concepts as index tuples against a shared attribute/level dictionary.
+
+    Args:
+        concept_lists: Lists of attribute dicts (``{attribute: level}``)
+
+    Returns:
+        ``(attributes, levels, rows)`` where ``levels[a]`` lists the levels
+        of ``attributes[a]`` in order of first appearance and each row holds
+        one level index per attribute, per concept, per input list
+    """
+    attributes: List[str] = []
+    levels: List[List[Any]] = []
+    positions: Dict[str, Tuple[int, Dict[Any, int]]] = {}
+    for concepts in concept_lists:
+        for concept in concepts:
+            for attr, level in concept.items():
+                if attr not in positions:
+                    positions[attr] = (len(attributes), {})
+                    attributes.append(attr)
+                    levels.append([])
+                a, index = positions[attr]
+                if level not in index:
+                    index[level] = len(levels[a])
+                    levels[a].append(level)
+    rows = [
+        [[positions[attr][1][concept[attr]] if attr in concept else -1 for attr in attributes] for concept in concepts]
+        for concepts in concept_lists
+    ]
+    return attributes, levels, rows
+
+
+def compact_tournament(task_number: int, concepts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compact form of a tournament task; concepts become ``[id, level index, ...]``."""
+    attributes, levels, rows = compact_concepts([[c["attributes"] for c in concepts]])
+    return {
+        "task_number": task_number,
+        "attributes": attributes,
+        "levels": levels,
+        "concepts": [[c["id"], *row] for c, row in zip(concepts, rows[0])],
+    }
+
+
+def compact_screening(tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compact form of a screening design; tasks become ``[id, position, response, level index, ...]``."""
+    attributes, levels, rows = compact_concepts([[t["concept"] for t in tasks]])
+    return {
+        "attributes": attributes,
+        "levels": levels,
+        "tasks": [[t["id"], t["position"], t["response"], *row] for t, row in zip(tasks, rows[0])],
+    }
+
+
+def compact_tournament_tasks(session_id: str, total_tasks: int, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compact form of a full tournament, sharing one dictionary across all tasks."""
+    attributes, levels, rows = compact_concepts([[c["attributes"] for c in t["concepts"]] for t in tasks])
+    return {
+        "session_id": session_id,
+        "total_tasks": total_tasks,
+        "attributes": attributes,
+        "levels": levels,
+        "tasks": [
+            {"task_number": t["task_number"], "concepts": [[c["id"], *row] for c, row in zip(t["concepts"], task_rows)]}
+            for t, task_rows in zip(tasks, rows)
+        ],
+    }
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _suffix_not_modified_etag(message: Message, encoding: str, request_headers: Headers) -> None:
+    """Give a 304 the ETag of the compressed representation the client revalidated.
+
+    A compressed 200 carries ``ETag: "...-<encoding>"``; the 304 answering
+    ``If-None-Match`` with that tag must carry the same one. Responses below
+    the size threshold were sent uncompressed, so a bare tag stays bare.
+    """
+    headers = MutableHeaders(raw=message["headers"])
+    etag = headers.get("etag")
+    if not etag or not etag.endswith('"'):
+        return
+    encoded = f'{etag[:-1]}-{encoding}"'
+    for tag in request_headers.get("if-none-match", "").split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == encoded:
+            headers["ETag"] = encoded
+            headers.add_vary_header("Accept-Encoding")
+            return
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 produces a gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware negotiating brotli/gzip ``Content-Encoding``.
+
+    Args:
+        app: The wrapped ASGI application
+        minimum_size: Complete responses smaller than this are sent as is
+        gzip_level: zlib compression level (1-9)
+        brotli_quality: brotli quality (0-11)
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = _choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or not content_type.startswith(_COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    if message["status"] == 304:
+                        _suffix_not_modified_etag(message, encoding, request_headers)
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body and len(body) < self.minimum_size:
+                    # Small complete response: not worth the CPU
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and etag.endswith('"'):
+                    # Each encoding is a different representation with its own strong ETag
+                    headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if not more_body:
+                    body = compressor.compress(body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_compressed)
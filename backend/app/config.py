@@ -0,0 +1,161 @@
+"""
+Runtime configuration.
+
+This module reads the tuning knobs of the API from environment variables
+(or a ``.env`` file) once at import time.
+"""
+
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# Cache backend shared by the session state and design caches:
+# "memory" (per process), "shm" (shared memory, one host), "redis" or
+# "local" (in-process stand-in for a shared backend, for tests).
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_MAX_ENTRIES = _env_int("CACHE_MAX_ENTRIES", 10000)
+CACHE_SHM_NAME = os.getenv("CACHE_SHM_NAME", "acbc_cache")
+CACHE_SHM_SLOTS = _env_int("CACHE_SHM_SLOTS", 8192)
+CACHE_SHM_SLOT_BYTES = _env_int("CACHE_SHM_SLOT_BYTES", 4096)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Session state cache, used for reads only: choices and re-estimation read
+# the utilities they update from the database, so a stale entry cannot
+# lose an update. With the "memory" backend and several workers, a worker
+# may still generate a design from utilities another worker has since
+# updated; use a shared backend (redis, shm) or disable the cache there.
+SESSION_CACHE_ENABLED = _env_bool("SESSION_CACHE_ENABLED", True)
+SESSION_CACHE_TTL = _env_float("SESSION_CACHE_TTL", 300.0)
+
+# Cache of generated tournament designs. Designs never change once stored,
+# so a stale entry is impossible and the cache is safe with any backend.
+DESIGN_CACHE_ENABLED = _env_bool("DESIGN_CACHE_ENABLED", True)
+DESIGN_CACHE_TTL = _env_float("DESIGN_CACHE_TTL", 3600.0)
+
+# Threads running CPU-heavy design generation, and processes for bulk work.
+DESIGN_EXECUTOR_WORKERS = _env_int("DESIGN_EXECUTOR_WORKERS", min(4, os.cpu_count() or 1))
+PROCESS_POOL_WORKERS = _env_int("PROCESS_POOL_WORKERS", os.cpu_count() or 1)
+
+# Speculative precomputation of the next tournament task after a choice.
+SPECULATIVE_PRECOMPUTE = _env_bool("SPECULATIVE_PRECOMPUTE", False)
+SPECULATIVE_MAX_OUTSTANDING = _env_int("SPECULATIVE_MAX_OUTSTANDING", 64)
+SPECULATIVE_TTL = _env_float("SPECULATIVE_TTL", 120.0)
+
+# Batch session creation: largest accepted batch and sessions per transaction.
+BATCH_MAX_SESSIONS = _env_int("BATCH_MAX_SESSIONS", 50000)
+BATCH_CHUNK_SIZE = _env_int("BATCH_CHUNK_SIZE", 500)
+
+# Cache-Control for stored designs. Screening designs change once, when
+# responses are recorded, so shared caches must revalidate them; a stored
+# tournament task never changes.
+SCREENING_CACHE_CONTROL = os.getenv("SCREENING_CACHE_CONTROL", "public, no-cache")
+TOURNAMENT_CACHE_CONTROL = os.getenv("TOURNAMENT_CACHE_CONTROL", "public, max-age=86400, immutable")
+
+# Response compression: bodies smaller than COMPRESSION_MIN_SIZE bytes are
+# sent uncompressed. Brotli is used when the optional brotli package is
+# installed and the client accepts it.
+COMPRESSION_MIN_SIZE = _env_int("COMPRESSION_MIN_SIZE", 500)
+GZIP_LEVEL = _env_int("GZIP_LEVEL", 6)
+BROTLI_QUALITY = _env_int("BROTLI_QUALITY", 4)
+
+# Recent raw -> normalised query strings kept by QueryNormalizationMiddleware.
+QUERY_CACHE_SIZE = _env_int("QUERY_CACHE_SIZE", 1024)
+
+# Startup: create the tables of an empty database and stamp it at the
+# Alembic head (local development); refuse to start when the schema is behind the
+# migrations instead of only logging a warning.
+AUTO_CREATE_SCHEMA = _env_bool("AUTO_CREATE_SCHEMA", True)
+REQUIRE_SCHEMA_HEAD = _env_bool("REQUIRE_SCHEMA_HEAD", False)
+# Connections opened before serving, and design warm-up for the most common
+# study configurations.
+POOL_WARM_CONNECTIONS = _env_int("POOL_WARM_CONNECTIONS", 3)
+STARTUP_WARMUP = _env_bool("STARTUP_WARMUP", True)
+WARMUP_CONFIGS = _env_int("WARMUP_CONFIGS", 3)
+
+# Admission control for design generation: requests generating designs at
+# once and waiting for a slot, per endpoint. Requests beyond that, or
+# waiting longer than ADMISSION_QUEUE_TIMEOUT seconds, get a 503 with
+# Retry-After: ADMISSION_RETRY_AFTER.
+ADMISSION_TOURNAMENT_CONCURRENCY = _env_int("ADMISSION_TOURNAMENT_CONCURRENCY", DESIGN_EXECUTOR_WORKERS)
+ADMISSION_TOURNAMENT_QUEUE = _env_int("ADMISSION_TOURNAMENT_QUEUE", 8 * DESIGN_EXECUTOR_WORKERS)
+ADMISSION_PREFETCH_CONCURRENCY = _env_int("ADMISSION_PREFETCH_CONCURRENCY", max(1, DESIGN_EXECUTOR_WORKERS // 2))
+ADMISSION_PREFETCH_QUEUE = _env_int("ADMISSION_PREFETCH_QUEUE", DESIGN_EXECUTOR_WORKERS)
+ADMISSION_QUEUE_TIMEOUT = _env_float("ADMISSION_QUEUE_TIMEOUT", 5.0)
+ADMISSION_RETRY_AFTER = _env_int("ADMISSION_RETRY_AFTER", 2)
+
+# Design degradation under load: switch tournament generation to a limited
+# exchange, then to cached or level-balanced random designs, when event-loop
+# lag (seconds) or the design backlog (queued jobs) reaches these levels.
+DEGRADE_ENABLED = _env_bool("DEGRADE_ENABLED", True)
+DEGRADE_LIMITED_LAG = _env_float("DEGRADE_LIMITED_LAG", 0.05)
+DEGRADE_LIMITED_BACKLOG = _env_int("DEGRADE_LIMITED_BACKLOG", DESIGN_EXECUTOR_WORKERS)
+DEGRADE_FALLBACK_LAG = _env_float("DEGRADE_FALLBACK_LAG", 0.25)
+DEGRADE_FALLBACK_BACKLOG = _env_int("DEGRADE_FALLBACK_BACKLOG", 4 * DESIGN_EXECUTOR_WORKERS)
+DEGRADE_CACHED_DESIGNS = _env_int("DEGRADE_CACHED_DESIGNS", 1024)
+LOOP_LAG_INTERVAL = _env_float("LOOP_LAG_INTERVAL", 0.1)
+
+# Background jobs (jobs table). A tournament design taking longer than
+# INLINE_DESIGN_BUDGET seconds inside a request is handed to a job and the
+# request answers 202 with the job URL (0 disables the budget). Each worker
+# runs JOB_CONCURRENCY jobs at once, renews a JOB_LEASE-second lease while
+# running, and retries a job lost to a crashed worker up to JOB_MAX_ATTEMPTS
+# times.
+INLINE_DESIGN_BUDGET = _env_float("INLINE_DESIGN_BUDGET", 0.0)
+JOB_CONCURRENCY = _env_int("JOB_CONCURRENCY", 2)
+JOB_MAX_ATTEMPTS = _env_int("JOB_MAX_ATTEMPTS", 3)
+JOB_LEASE = _env_float("JOB_LEASE", 60.0)
+JOB_POLL_INTERVAL = _env_float("JOB_POLL_INTERVAL", 2.0)
+JOB_RETRY_AFTER = _env_int("JOB_RETRY_AFTER", 1)
+
+# Send each request's database statement count and time as X-DB-Statements
+# and Server-Timing headers (debugging; the totals are always exported on
+# /metrics).
+DEBUG_QUERY_HEADERS = _env_bool("DEBUG_QUERY_HEADERS", False)
+
+# Request tracing (see tracing.py): share of requests traced (0 disables),
+# and where finished spans go: "memory" (the last TRACE_MEMORY_SPANS spans),
+# "file" (JSON lines appended to TRACE_FILE) or "none".
+TRACE_SAMPLE_RATE = _env_float("TRACE_SAMPLE_RATE", 0.0)
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "memory")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_MEMORY_SPANS = _env_int("TRACE_MEMORY_SPANS", 10000)
+
+# On-demand profiling (see profiling.py): requests sending this token in an
+# X-Profile header are profiled every PROFILE_INTERVAL seconds and the
+# profile written to PROFILE_DIR. Empty disables profiling.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = _env_float("PROFILE_INTERVAL", 0.005)
+
+# Readiness (/health/ready, see health.py): the worker reports not ready
+# when a SELECT 1 takes longer than READY_MAX_DB_LATENCY seconds (or fails
+# within READY_DB_TIMEOUT), a pool checkout takes longer than
+# READY_MAX_POOL_WAIT, more than READY_MAX_EXECUTOR_QUEUE designs wait for an
+# executor thread, or the event loop lags by more than READY_MAX_LOOP_LAG.
+# Results are reused for READY_CACHE_TTL seconds.
+READY_CACHE_TTL = _env_float("READY_CACHE_TTL", 1.0)
+READY_DB_TIMEOUT = _env_float("READY_DB_TIMEOUT", 2.0)
+READY_MAX_DB_LATENCY = _env_float("READY_MAX_DB_LATENCY", 0.5)
+READY_MAX_POOL_WAIT = _env_float("READY_MAX_POOL_WAIT", 0.5)
+READY_MAX_EXECUTOR_QUEUE = _env_int("READY_MAX_EXECUTOR_QUEUE", 64)
+READY_MAX_LOOP_LAG = _env_float("READY_MAX_LOOP_LAG", 1.0)
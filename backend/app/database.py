@@ -8,6 +8,9 @@ import os
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from .metrics import Gauge
+from .serialization import json_serializer, loads
+from .tracing import instrument_engine
 
 # Load environment variables
 load_dotenv()
@@ -29,9 +32,24 @@ engine = create_async_engine(
     DATABASE_URL, 
     echo=False,  # Set to False for production
     pool_pre_ping=True,
-    pool_recycle=300
+    pool_recycle=300,
+    json_serializer=json_serializer,
+    json_deserializer=loads
 )
 
+instrument_engine(engine.sync_engine)
+
+def _pool_usage():
+    """Connections of the pool by state; pools without a size (e.g. NullPool) report none."""
+    pool = engine.sync_engine.pool
+    usage = {}
+    for state, method in (("size", "size"), ("checked_out", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow")):
+        if hasattr(pool, method):
+            usage[(state,)] = getattr(pool, method)()
+    return usage
+
+Gauge("acbc_db_pool_connections", "Database pool connections, per state.", ("state",)).set_function(_pool_usage)
+
 AsyncSessionLocal = sessionmaker(
     engine, 
     class_=AsyncSession, 
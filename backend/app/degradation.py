@@ -0,0 +1,154 @@
+"""
+Load-aware choice of the tournament design algorithm.
+
+The full coordinate exchange is the slowest part of a tournament request.
+When the worker falls behind, ``DesignPolicy`` trades design quality for
+throughput, based on event-loop lag and the design backlog (jobs queued on
+the design executor plus requests queued by admission control):
+
+- ``exchange``: full coordinate exchange (no pressure)
+- ``limited``: a few exchange steps over a sample of candidates (moderate)
+- ``cached``: the design generated last for the same design space and task
+  number, if any (heavy)
+- ``random_balanced``: level-balanced random concepts (heavy, nothing cached)
+
+The two cheapest algorithms take microseconds and run on the event loop
+without queueing. The algorithm used is stored with each tournament task.
+"""
+
+import asyncio
+import collections
+import copy
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config, utils
+from .admission import prefetch_limiter, tournament_limiter
+from .executor import queue_depth
+from .metrics import Counter, Gauge, Histogram
+
+# Cheap enough to run inline on the event loop
+INLINE_ALGORITHMS = ("cached", "random_balanced")
+
+_lag_samples = Histogram(
+    "acbc_event_loop_lag_sample_seconds",
+    "Event-loop lag of each monitor wake-up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+_algorithm_used = Counter("acbc_design_algorithm_total", "Tournament designs generated, per algorithm.", ("algorithm",))
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up from a short sleep.
+
+    The reported lag follows increases at once and decays slowly, so a burst
+    of blocking work keeps the policy degraded for a moment afterwards.
+    """
+
+    def __init__(self, interval: float = 0.1, decay: float = 0.8):
+        self.interval = interval
+        self.decay = decay
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            _lag_samples.observe(lag)
+            self.lag = lag if lag > self.lag else self.lag * self.decay + lag * (1 - self.decay)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.lag = 0.0
+
+
+loop_lag = LoopLagMonitor(config.LOOP_LAG_INTERVAL)
+
+Gauge("acbc_event_loop_lag_seconds", "Smoothed event-loop lag.").set_function(lambda: {(): loop_lag.lag})
+
+
+def design_backlog() -> int:
+    """Design jobs waiting for an executor thread or an admission slot."""
+    return queue_depth() + tournament_limiter.queued + prefetch_limiter.queued
+
+
+Gauge("acbc_design_backlog", "Design jobs waiting for an executor thread or admission slot.").set_function(
+    lambda: {(): design_backlog()}
+)
+
+
+class DesignPolicy:
+    """
+    Picks the tournament design algorithm and keeps recent designs for reuse.
+
+    Args:
+        max_cached: Designs kept for the ``cached`` algorithm
+    """
+
+    def __init__(self, max_cached: int = 1024):
+        self.max_cached = max_cached
+        # Filled from executor threads, read on the event loop
+        self._lock = threading.Lock()
+        self._designs: "collections.OrderedDict[Tuple, List[Dict[str, Any]]]" = collections.OrderedDict()
+
+    def choose(self) -> str:
+        """The algorithm to use for a design requested now."""
+        if not config.DEGRADE_ENABLED:
+            return "exchange"
+        lag, backlog = loop_lag.lag, design_backlog()
+        if lag >= config.DEGRADE_FALLBACK_LAG or backlog >= config.DEGRADE_FALLBACK_BACKLOG:
+            return "cached"
+        if lag >= config.DEGRADE_LIMITED_LAG or backlog >= config.DEGRADE_LIMITED_BACKLOG:
+            return "limited"
+        return "exchange"
+
+    @staticmethod
+    def _key(utilities, byo, task_number: int, n_options: int) -> Tuple:
+        space = utils.filter_design_space_for_tournament(utilities, byo)
+        return tuple((attr, tuple(levels)) for attr, levels in space.items()), task_number, n_options
+
+    def generate(self, utilities, byo, task_number: int, n_options: int, algorithm: str) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Generate a tournament design with ``algorithm``.
+
+        ``cached`` falls back to ``random_balanced`` when no design for the
+        same design space and task number has been generated yet.
+
+        Returns:
+            ``(concepts, algorithm actually used)``
+        """
+        key = self._key(utilities or {}, byo, task_number, n_options)
+        if algorithm == "cached":
+            with self._lock:
+                cached = self._designs.get(key)
+            if cached is not None:
+                _algorithm_used.inc(algorithm="cached")
+                return copy.deepcopy(cached), "cached"
+            algorithm = "random_balanced"
+
+        concepts = utils.generate_tournament_set(utilities, byo, task_number, n_options, algorithm=algorithm)
+        if algorithm != "random_balanced":
+            with self._lock:
+                self._designs[key] = concepts
+                self._designs.move_to_end(key)
+                if len(self._designs) > self.max_cached:
+                    self._designs.popitem(last=False)
+        _algorithm_used.inc(algorithm=algorithm)
+        return concepts, algorithm
+
+    def generate_many(self, utilities, byo, task_numbers: List[int], n_options: int, algorithm: str) -> Dict[int, Tuple[List[Dict[str, Any]], str]]:
+        """``generate`` for several task numbers of one session."""
+        return {n: self.generate(utilities, byo, n, n_options, algorithm) for n in task_numbers}
+
+
+design_policy = DesignPolicy(config.DEGRADE_CACHED_DESIGNS)
@@ -0,0 +1,125 @@
+"""
+Executors for CPU-heavy design work.
+
+Design generation for single requests runs in a thread pool so it does not
+stall the event loop while it runs. The pool keeps track of how many jobs
+are waiting and running, which other parts of the API use to judge how busy
+the worker is. Bulk work that should use every core runs in a process pool.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Any, Callable, Optional
+
+from . import config
+from .metrics import Gauge
+from .profiling import active_profile
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+# Quoted so the multiprocessing machinery is only imported by processes that use the pool
+_process_pool: Optional["concurrent.futures.ProcessPoolExecutor"] = None
+# Updated from executor threads as well as the event loop.
+_lock = threading.Lock()
+_queued = 0
+_running = 0
+
+Gauge("acbc_design_executor_queued", "Design jobs waiting for an executor thread.").set_function(
+    lambda: {(): _queued}
+)
+Gauge("acbc_design_executor_running", "Design jobs currently running.").set_function(
+    lambda: {(): _running}
+)
+
+
+def get_design_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """The process-wide design executor, created on first use."""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=config.DESIGN_EXECUTOR_WORKERS,
+            thread_name_prefix="acbc-design",
+        )
+    return _executor
+
+
+def _tracked(fn: Callable[..., Any], *args: Any) -> Any:
+    global _queued, _running
+    with _lock:
+        _queued -= 1
+        _running += 1
+    try:
+        profile = active_profile.get()
+        if profile is None:
+            return fn(*args)
+        with profile.track_thread():
+            return fn(*args)
+    finally:
+        with _lock:
+            _running -= 1
+
+
+def _on_done(future: concurrent.futures.Future) -> None:
+    global _queued
+    # A job cancelled before it started never left the queue.
+    if future.cancelled():
+        with _lock:
+            _queued -= 1
+
+
+def submit_design(fn: Callable[..., Any], *args: Any) -> concurrent.futures.Future:
+    """Queue ``fn(*args)`` on the design executor."""
+    global _queued
+    with _lock:
+        _queued += 1
+    # Run in a copy of the caller's context, so the design joins the caller's trace
+    future = get_design_executor().submit(contextvars.copy_context().run, _tracked, fn, *args)
+    future.add_done_callback(_on_done)
+    return future
+
+
+async def run_design(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run ``fn(*args)`` on the design executor and await its result."""
+    return await asyncio.wrap_future(submit_design(fn, *args))
+
+
+def queue_depth() -> int:
+    """Number of design jobs waiting for a thread."""
+    return _queued
+
+
+def running() -> int:
+    """Number of design jobs currently running."""
+    return _running
+
+
+def get_process_pool() -> "concurrent.futures.ProcessPoolExecutor":
+    """The process-wide pool for bulk work, created on first use."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=config.PROCESS_POOL_WORKERS)
+    return _process_pool
+
+
+async def run_in_process_pool(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a picklable ``fn(*args)`` in the process pool and await its result."""
+    return await asyncio.get_running_loop().run_in_executor(get_process_pool(), fn, *args)
+
+
+def reset_process_pool() -> None:
+    """Drop a broken process pool; the next use starts a fresh one."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def shutdown_design_executor() -> None:
+    global _executor, _process_pool
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
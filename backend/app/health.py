@@ -0,0 +1,101 @@
+"""
+Readiness checks.
+
+``/health/live`` only shows that the worker answers. ``/health/ready`` also
+checks what the worker needs to serve respondents: a database round trip
+(``SELECT 1``), the time to check a connection out of the pool, the number
+of designs waiting for an executor thread and the event-loop lag. Each is
+compared with its ``READY_*`` threshold; a worker failing any check (or
+shutting down) answers 503, so the load balancer stops routing to it.
+
+The result is cached for ``READY_CACHE_TTL`` seconds and concurrent probes
+share one check, so frequent probes add at most one ``SELECT 1`` per
+interval. Each check checks a connection out of the pool for the
+``SELECT 1`` and returns it, so no connection is held between checks.
+
+A worker stops reporting ready as soon as it receives SIGTERM (see
+``startup.py``), before the server closes its connections.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from . import config
+from .database import engine
+from .degradation import loop_lag
+from .executor import queue_depth
+from .metrics import Gauge
+from .singleflight import SingleFlight
+
+
+def _check(value: float, limit: float) -> Dict[str, Any]:
+    return {"value": round(value, 4), "limit": limit, "ok": value <= limit}
+
+
+class Readiness:
+    """
+    Cached readiness of this worker.
+
+    Args:
+        ttl: Seconds a result is reused
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # Set on SIGTERM, so the worker is taken out of rotation while it drains
+        self.draining = False
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._flight = SingleFlight("readiness")
+
+    async def _round_trip(self):
+        started = time.perf_counter()
+        # With a pool this is an idle connection (or the wait for one); with
+        # NullPool (SQLite) it opens a new connection
+        async with engine.connect() as conn:
+            checked_out = time.perf_counter()
+            await conn.execute(text("SELECT 1"))
+            return checked_out - started, time.perf_counter() - checked_out
+
+    async def _database(self) -> Dict[str, Any]:
+        """Pool checkout wait and ``SELECT 1`` round trip, or the error when they fail."""
+        try:
+            pool_wait, latency = await asyncio.wait_for(self._round_trip(), config.READY_DB_TIMEOUT)
+        except asyncio.TimeoutError:
+            return {"database": {"ok": False, "error": "timed out", "limit": config.READY_DB_TIMEOUT}}
+        except Exception as e:
+            return {"database": {"ok": False, "error": type(e).__name__, "limit": config.READY_DB_TIMEOUT}}
+        return {
+            "pool_wait": _check(pool_wait, config.READY_MAX_POOL_WAIT),
+            "database": _check(latency, config.READY_MAX_DB_LATENCY),
+        }
+
+    async def _run(self) -> Dict[str, Any]:
+        checks = await self._database()
+        checks["executor_queue"] = _check(queue_depth(), config.READY_MAX_EXECUTOR_QUEUE)
+        checks["event_loop_lag"] = _check(loop_lag.lag, config.READY_MAX_LOOP_LAG)
+        ready = all(check["ok"] for check in checks.values())
+        self._result = {"status": "ready" if ready else "not_ready", "checks": checks}
+        self._checked_at = time.monotonic()
+        return self._result
+
+    async def check(self) -> Dict[str, Any]:
+        """``{"status": "ready" | "not_ready" | "draining", "checks": {...}}``"""
+        if self.draining:
+            return {"status": "draining", "checks": {}}
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._result
+        return await self._flight.do("ready", self._run)
+
+    def ready(self) -> float:
+        return 1.0 if self._result is not None and self._result["status"] == "ready" and not self.draining else 0.0
+
+
+readiness = Readiness(config.READY_CACHE_TTL)
+
+Gauge("acbc_ready", "Whether the last readiness check passed (1) or failed (0).").set_function(
+    lambda: {(): readiness.ready()}
+)
@@ -0,0 +1,56 @@
+"""
+HTTP caching helpers.
+
+Stored designs never change once generated, so their responses can carry
+strong ETags and be revalidated with ``If-None-Match`` by clients and
+shared caches without resending the concepts.
+"""
+
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+_ENCODING_SUFFIXES = ('-gzip"', '-br"')
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag derived from the identity and version of a stored resource."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's ``If-None-Match`` header matches ``etag``.
+
+    ``If-None-Match`` uses the weak comparison, so ``W/`` prefixes are
+    ignored, as are the ``-gzip``/``-br`` suffixes added by
+    ``CompressionMiddleware`` to compressed representations.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        for suffix in _ENCODING_SUFFIXES:
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)] + '"'
+                break
+        if tag == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    # The compact format is negotiated with the Accept header
+    return {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept"}
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Empty 304 response carrying the validators of the unchanged resource."""
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
+
@@ -0,0 +1,304 @@
+"""
+Background jobs for design and estimation work that outlasts a request.
+
+Jobs live in the ``jobs`` table of the application database, so no broker
+is needed. Each web worker runs a ``JobRunner`` that claims queued jobs with
+a conditional UPDATE, runs the CPU-heavy part in the process pool, and
+renews a lease while it works. A job whose worker died (its lease expired)
+or whose process pool broke is queued again, up to ``JOB_MAX_ATTEMPTS``
+attempts.
+
+Job kinds:
+
+- ``tournament``: every planned tournament task of a session, full exchange
+- ``tournament_task``: one tournament task, full exchange; also created
+  when an inline design exceeds ``INLINE_DESIGN_BUDGET``
+- ``reestimate``: repair a session's utilities by replaying its stored
+  responses through the online updates (not a different estimator)
+"""
+
+import asyncio
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select, update
+
+from . import config, models, services, utils
+from .database import AsyncSessionLocal
+from .executor import reset_process_pool, run_in_process_pool
+from .metrics import Counter, Gauge
+
+JOB_KINDS = ("tournament", "tournament_task", "reestimate")
+
+_finished = Counter("acbc_jobs_finished_total", "Jobs finished, per kind and final status.", ("kind", "status"))
+_retried = Counter("acbc_jobs_retried_total", "Job attempts lost to a crashed worker.", ("kind",))
+
+
+class DesignPending(HTTPException):
+    """202 raised when a design moved to a background job; poll ``status_url``."""
+
+    def __init__(self, job_id: str):
+        status_url = f"/api/jobs/{job_id}"
+        super().__init__(
+            status_code=202,
+            detail={"message": "Design is still being generated", "job_id": job_id, "status_url": status_url},
+            headers={"Location": status_url, "Retry-After": str(config.JOB_RETRY_AFTER)},
+        )
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _exchange_design(utilities, byo_config, task_number: int, nso: int):
+    return utils.generate_tournament_set(utilities, byo_config, task_number, nso), "exchange"
+
+
+def _exchange_designs(utilities, byo_config, task_numbers, nso: int):
+    return {n: _exchange_design(utilities, byo_config, n, nso) for n in task_numbers}
+
+
+async def _generate_in_pool(utilities, byo_config, task_number: int, nso: int):
+    return await run_in_process_pool(_exchange_design, utilities, byo_config, task_number, nso)
+
+
+async def _generate_many_in_pool(utilities, byo_config, task_numbers, nso: int):
+    return await run_in_process_pool(_exchange_designs, utilities, byo_config, task_numbers, nso)
+
+
+async def _run_tournament(db, params: Dict[str, Any]) -> Dict[str, Any]:
+    total_tasks, tasks = await services.get_all_tournament_tasks(
+        db, params["session_id"], params.get("n_options", 3), generate=_generate_many_in_pool
+    )
+    return {"session_id": params["session_id"], "total_tasks": total_tasks, "tasks": tasks}
+
+
+async def _run_tournament_task(db, params: Dict[str, Any]) -> Dict[str, Any]:
+    concepts = await services.get_tournament(
+        db, params["session_id"], params["task_number"], params.get("n_options", 3), generate=_generate_in_pool
+    )
+    return {"task_number": params["task_number"], "concepts": concepts}
+
+
+async def _run_reestimate(db, params: Dict[str, Any]) -> Dict[str, Any]:
+    utilities = await services.reestimate_utilities(db, params["session_id"])
+    return {"session_id": params["session_id"], "utilities": utilities}
+
+
+_HANDLERS: Dict[str, Callable[[Any, Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    "tournament": _run_tournament,
+    "tournament_task": _run_tournament_task,
+    "reestimate": _run_reestimate,
+}
+
+
+def job_status(job: models.Job) -> Dict[str, Any]:
+    """Public view of a job row (without its result)."""
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": job.params,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class JobRunner:
+    """
+    Claims and runs jobs from the jobs table.
+
+    Args:
+        concurrency: Jobs run at once by this worker
+        max_attempts: Attempts before a job that keeps crashing fails
+        lease: Seconds a claim is valid without renewal
+        poll_interval: Seconds between checks for jobs queued by other workers
+    """
+
+    def __init__(self, concurrency: int, max_attempts: int, lease: float, poll_interval: float):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._tasks: Set[asyncio.Task] = set()
+        self._poller: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        # Keys of adopted work still running in this worker, with their job IDs
+        self._adopted: Dict[Hashable, str] = {}
+        Gauge("acbc_jobs_running", "Jobs running in this worker.").set_function(lambda: {(): len(self._tasks)})
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> models.Job:
+        """Queue a job; returns its row."""
+        if kind not in _HANDLERS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job = models.Job(id=str(uuid.uuid4()), kind=kind, status="queued", params=params, attempts=0, created_at=_now())
+        async with AsyncSessionLocal() as db:
+            db.add(job)
+            await db.commit()
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    async def adopt(
+        self, kind: str, params: Dict[str, Any], work: Awaitable[Dict[str, Any]], key: Optional[Hashable] = None
+    ) -> str:
+        """
+        Record work already in progress in this worker as a running job.
+
+        If the work fails, the job is queued again and rerun from ``params``.
+        With a ``key``, the job can be found with ``adopted(key)`` until the
+        work is done, so retried requests wait for it instead of starting the
+        same work again.
+
+        Returns:
+            The job ID
+        """
+        now = _now()
+        job = models.Job(
+            id=str(uuid.uuid4()), kind=kind, status="running", params=params, attempts=1,
+            created_at=now, started_at=now, lease_expires=now + timedelta(seconds=self.lease),
+        )
+        async with AsyncSessionLocal() as db:
+            db.add(job)
+            await db.commit()
+        task = asyncio.get_running_loop().create_task(self._finish(job.id, kind, work))
+        if key is not None:
+            self._adopted[key] = job.id
+            task.add_done_callback(lambda _: self._adopted.pop(key, None))
+        self._track(task)
+        return job.id
+
+    def adopted(self, key: Hashable) -> Optional[str]:
+        """ID of the job running work adopted under ``key`` in this worker, if any."""
+        return self._adopted.get(key)
+
+    async def get(self, job_id: str) -> Optional[models.Job]:
+        async with AsyncSessionLocal() as db:
+            return await db.get(models.Job, job_id)
+
+    def start(self) -> None:
+        if self._poller is None:
+            self._wake = asyncio.Event()
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stop claiming jobs and abandon running ones; their leases expire and another worker retries them."""
+        tasks = [t for t in [self._poller, *self._tasks] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._poller = None
+        self._tasks.clear()
+        self._adopted.clear()
+
+    def _track(self, task: asyncio.Task) -> None:
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._wake and self._wake.set())
+
+    async def _poll(self) -> None:
+        while True:
+            self._wake.clear()
+            free = self.concurrency - len(self._tasks)
+            if free > 0:
+                for job in await self._claim(free):
+                    self._track(asyncio.get_running_loop().create_task(self._execute(job)))
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claimable(self, now: datetime):
+        return or_(
+            models.Job.status == "queued",
+            and_(models.Job.status == "running", models.Job.lease_expires < now),
+        )
+
+    async def _claim(self, limit: int):
+        now = _now()
+        claimed = []
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Job.id).where(self._claimable(now)).order_by(models.Job.created_at).limit(limit)
+            )
+            for job_id in result.scalars().all():
+                # Another worker may claim the same job; only one UPDATE matches
+                updated = await db.execute(
+                    update(models.Job)
+                    .where(models.Job.id == job_id)
+                    .where(self._claimable(now))
+                    .values(
+                        status="running",
+                        attempts=models.Job.attempts + 1,
+                        started_at=now,
+                        lease_expires=now + timedelta(seconds=self.lease),
+                    )
+                )
+                if updated.rowcount == 1:
+                    claimed.append(job_id)
+            await db.commit()
+            jobs = [await db.get(models.Job, job_id) for job_id in claimed]
+        return jobs
+
+    async def _renew(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(models.Job)
+                    .where(models.Job.id == job_id)
+                    .where(models.Job.status == "running")
+                    .values(lease_expires=_now() + timedelta(seconds=self.lease))
+                )
+                await db.commit()
+
+    async def _set(self, job_id: str, **values) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(models.Job).where(models.Job.id == job_id).values(**values))
+            await db.commit()
+
+    async def _execute(self, job: models.Job) -> None:
+        if job.attempts > self.max_attempts:
+            await self._set(job.id, status="failed", error=f"Gave up after {job.attempts - 1} attempts", finished_at=_now(), lease_expires=None)
+            _finished.inc(kind=job.kind, status="failed")
+            return
+
+        async def work():
+            async with AsyncSessionLocal() as db:
+                return await _HANDLERS[job.kind](db, job.params)
+
+        await self._finish(job.id, job.kind, work())
+
+    async def _finish(self, job_id: str, kind: str, work: Awaitable[Dict[str, Any]]) -> None:
+        renewal = asyncio.get_running_loop().create_task(self._renew(job_id))
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            raise
+        except BrokenProcessPool:
+            # A worker process died; the job itself may be fine
+            reset_process_pool()
+            _retried.inc(kind=kind)
+            await self._set(job_id, status="queued", lease_expires=None)
+        except Exception as e:
+            if isinstance(e, (ValueError, KeyError, IndexError)):
+                await self._set(job_id, status="failed", error=str(e), finished_at=_now(), lease_expires=None)
+                _finished.inc(kind=kind, status="failed")
+            else:
+                # Unexpected errors (database, adopted work) are retried from the params
+                _retried.inc(kind=kind)
+                await self._set(job_id, status="queued", error=str(e), lease_expires=None)
+        else:
+            await self._set(job_id, status="succeeded", result=result, error=None, finished_at=_now(), lease_expires=None)
+            _finished.inc(kind=kind, status="succeeded")
+        finally:
+            renewal.cancel()
+
+
+job_runner = JobRunner(config.JOB_CONCURRENCY, config.JOB_MAX_ATTEMPTS, config.JOB_LEASE, config.JOB_POLL_INTERVAL)
@@ -1,20 +1,46 @@
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import byo, screening, tournament
-from .database import engine, Base
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from .routers import admin, byo, ingest, jobs, screening, tournament
+from .compression import CompressionMiddleware
+from .querystring import QueryNormalizationMiddleware
+from .query_stats import QueryStatsMiddleware
+from .request_metrics import RequestMetricsMiddleware
+from .tracing import TracingMiddleware
+from .profiling import ProfilingMiddleware
+from .config import (
+    BROTLI_QUALITY,
+    COMPRESSION_MIN_SIZE,
+    DEBUG_QUERY_HEADERS,
+    GZIP_LEVEL,
+    PROFILE_DIR,
+    PROFILE_INTERVAL,
+    PROFILE_TOKEN,
+    QUERY_CACHE_SIZE,
+)
+from .health import readiness
+from .metrics import render_prometheus
+from .startup import lifespan
 import os
 
 app = FastAPI(
     title="ACBC API",
     description="Adaptive Choice-Based Conjoint Analysis API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    # Schema check, connection pool and design warm-up; see startup.py
+    lifespan=lifespan(_import_started),
 )
 
-@app.on_event("startup")
-async def startup():
-    """Create database tables on startup."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+# Count database statements per request; innermost, so it sees the matched route
+app.add_middleware(QueryStatsMiddleware, headers=DEBUG_QUERY_HEADERS)
+
+# Request latency histograms per route and status; also needs the matched route
+app.add_middleware(RequestMetricsMiddleware)
 
 # CORS middleware configuration
 app.add_middleware(
@@ -25,9 +51,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large design payloads and streamed progress for mobile clients
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=GZIP_LEVEL,
+    brotli_quality=BROTLI_QUALITY,
+)
+
+# Repair malformed survey-platform URLs once, before routing
+app.add_middleware(QueryNormalizationMiddleware, cache_size=QUERY_CACHE_SIZE)
+
+# Profile requests carrying the profiling token; not installed without one
+if PROFILE_TOKEN:
+    app.add_middleware(ProfilingMiddleware, token=PROFILE_TOKEN, directory=PROFILE_DIR, interval=PROFILE_INTERVAL)
+
+# Root span of sampled requests; added last (outermost), so the whole request is traced
+app.add_middleware(TracingMiddleware)
+
 app.include_router(byo.router, prefix="/api/byo-config", tags=["BYO"])
 app.include_router(screening.router, prefix="/api/screening", tags=["Screening"])
 app.include_router(tournament.router, prefix="/api/tournament", tags=["Tournament"])
+app.include_router(ingest.router, prefix="/api/ingest", tags=["Ingest"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"], include_in_schema=False)
 
 @app.get("/")
 async def root():
@@ -40,11 +87,26 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for Heroku."""
+    """Health check endpoint for Heroku (liveness only, like ``/health/live``)."""
     return {"status": "healthy"}
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the worker is running and its event loop answers."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 while the database, pool, design executor or event loop is over its threshold."""
+    result = await readiness.check()
+    return ORJSONResponse(result, status_code=200 if result["status"] == "ready" else 503)
+
 @app.post("/health")
 async def health_check_post():
     """Health check endpoint for Heroku (POST method support)."""
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose in-process metrics in the Prometheus text format."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
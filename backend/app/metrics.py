@@ -0,0 +1,194 @@
+"""
+In-process metrics registry.
+
+This module holds the counters, gauges and histograms recorded by the API
+and renders them in the Prometheus text exposition format for the
+``/metrics`` endpoint.
+
+Recording takes no lock: values live in plain dicts and lists updated under
+the GIL, and histogram buckets are allocated once per label set. An update
+racing another thread can occasionally be lost, which is acceptable for
+monitoring and keeps recording cheap enough to leave on in production.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Point-in-time value; either set explicitly or read from a callback."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        """Read values from ``function`` at scrape time instead of stored ones.
+
+        The callback returns a mapping of label-value tuples to gauge values.
+        """
+        self._function = function
+
+    def value(self, **labels: str) -> float:
+        if self._function is not None:
+            return self._function().get(self._key(labels), 0)
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        values = self._function() if self._function is not None else self._values
+        return [(self.name, key, value) for key, value in values.items()]
+
+
+# Seconds; from a cached lookup (1 ms) to a slow D-optimal search (30 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count per bucket plus one for +Inf, then the sum
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: Tuple[str, ...], value: float) -> None:
+        values = self._values.get(key)
+        if values is None:
+            values = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        """Context manager observing the duration of its block, also when it raises."""
+        return _Timer(self, self._key(labels))
+
+    def count(self, **labels: str) -> int:
+        values = self._values.get(self._key(labels))
+        return int(sum(values[:-1])) if values else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        bounds = [repr(float(b)) for b in self.buckets] + ["+Inf"]
+        for key, values in list(self._values.items()):
+            labels = _format_labels(self.labelnames, key)
+            prefix = labels[:-1] + "," if labels else "{"
+            cumulative = 0
+            for bound, count in zip(bounds, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{labels} {values[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    # A plain class rather than @contextmanager: cheaper on hot paths
+    __slots__ = ("histogram", "key", "started")
+
+    def __init__(self, histogram: Histogram, key: Tuple[str, ...]):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram._observe(self.key, time.perf_counter() - self.started)
+
+
+# Internal stages of a request; recorded with ``stage(name)``
+STAGE_SECONDS = Histogram("acbc_stage_seconds", "Duration of internal request stages.", ("stage",))
+
+
+def stage(name: str):
+    """Time a block as one of the stages in ``acbc_stage_seconds``.
+
+    Stages are ``session_load``, ``screening_generation``, ``filtering``,
+    ``candidate_enumeration``, ``d_optimal_search`` and ``commit``.
+    """
+    return STAGE_SECONDS.time(stage=name)
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
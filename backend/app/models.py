@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, JSON, Float, Boolean, ForeignKey
+from sqlalchemy import Column, String, Integer, JSON, Float, Boolean, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -26,4 +26,22 @@ class TournamentTask(Base):
     task_number = Column(Integer, nullable=False)
     concepts = Column(JSON, nullable=False)
     choice = Column(Integer, nullable=True)
-    session = relationship('Session', back_populates='tournament_tasks')
\ No newline at end of file
+    # Design algorithm that produced the concepts (NULL: generated before it was recorded)
+    algorithm = Column(String, nullable=True)
+    session = relationship('Session', back_populates='tournament_tasks')
+
+class Job(Base):
+    __tablename__ = 'jobs'
+    id = Column(String, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    # queued, running, succeeded or failed
+    status = Column(String, nullable=False, index=True)
+    params = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # A running job whose lease has expired is retried by any worker
+    lease_expires = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,212 @@
+"""
+On-demand profiling of single requests.
+
+A request carrying ``X-Profile: <PROFILE_TOKEN>`` (or ``?_profile=<token>``)
+runs under a sampling profiler. Every ``PROFILE_INTERVAL`` seconds a
+background thread records the stack of the request's task: the running
+frames when the task is on the event loop, or the chain of awaiting
+coroutines (ending in ``(waiting)``) while it waits, e.g. for the database.
+Design work the request sends to the executor threads is sampled too;
+work on the process pool is not.
+
+The samples are written in the folded-stack format read by
+``flamegraph.pl``, speedscope and most flamegraph viewers, to
+``PROFILE_DIR/<id>.folded``. The response names the profile in an
+``X-Profile-Id`` header; ``GET /admin/profiles/{id}`` (with the same
+header) returns it.
+
+Profiling is off when ``PROFILE_TOKEN`` is empty: the middleware is then
+not installed, and executor jobs only check an unset context variable.
+"""
+
+import asyncio
+import collections
+import contextvars
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY_PARAM = "_profile"
+# Profile IDs as generated by ``ProfilingMiddleware`` (also guards file names)
+PROFILE_ID = re.compile(r"^[0-9A-Za-z-]+$")
+
+# The profile of the current request, inherited by executor jobs it submits
+active_profile: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar("active_profile", default=None)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def _current_tasks() -> Dict[asyncio.AbstractEventLoop, asyncio.Task]:
+    return getattr(asyncio.tasks, "_current_tasks", {})
+
+
+class Profile:
+    """
+    Samples the stacks of one asyncio task and of the executor threads working for it.
+
+    Args:
+        task: The request's task
+        interval: Seconds between samples
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float = 0.005):
+        self.task = task
+        self.interval = interval
+        self.samples: collections.Counter = collections.Counter()
+        self._loop = task.get_loop()
+        self._loop_thread = threading.get_ident()
+        self._root = task.get_coro().cr_frame
+        # Executor threads currently running jobs for this request
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._sampler = threading.Thread(target=self._run, name="acbc-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    @contextmanager
+    def track_thread(self) -> Iterator[None]:
+        """Sample the calling (executor) thread while the block runs."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[ident] -= 1
+                if not self._threads[ident]:
+                    del self._threads[ident]
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        if _current_tasks().get(self._loop) is self.task:
+            stack = self._running_stack(frames.get(self._loop_thread))
+        else:
+            stack = self._waiting_stack()
+        if stack:
+            self.samples[";".join(stack)] += 1
+
+        with self._lock:
+            threads = list(self._threads)
+        for ident in threads:
+            frame = frames.get(ident)
+            names: List[str] = []
+            while frame is not None and frame.f_code.co_name != "_tracked":
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.samples[";".join(["(executor)"] + names[::-1])] += 1
+
+    def _running_stack(self, frame) -> List[str]:
+        """Frames from the task's outermost coroutine down to the running one."""
+        names: List[str] = []
+        while frame is not None:
+            names.append(_frame_name(frame))
+            if frame is self._root:
+                return names[::-1]
+            frame = frame.f_back
+        # Not inside the task's coroutine (e.g. a callback it scheduled)
+        return ["(event loop)"] + names[::-1][-8:]
+
+    def _waiting_stack(self) -> List[str]:
+        """Frames of the coroutines the suspended task is awaiting, outermost first."""
+        # Task.get_stack() only returns the outermost frame of a suspended task
+        names: List[str] = []
+        awaitable = self.task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is not None:
+                names.append(_frame_name(frame))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        return names + ["(waiting)"] if names else []
+
+    def folded(self) -> str:
+        """Samples in the folded-stack format (``frame;frame;frame count`` per line)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def profile_path(directory: str, profile_id: str) -> str:
+    return os.path.join(directory, f"{profile_id}.folded")
+
+
+def authorized(token: str, value: Optional[str]) -> bool:
+    """Whether ``value`` matches the configured profiling token (never when none is set)."""
+    return bool(token) and value is not None and hmac.compare_digest(value.encode(), token.encode())
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that carry the profiling token.
+
+    Args:
+        app: The wrapped ASGI application
+        token: Value of ``X-Profile`` (or ``_profile``) that turns profiling on
+        directory: Where profiles are written
+        interval: Seconds between samples
+    """
+
+    def __init__(self, app: ASGIApp, token: str, directory: str, interval: float):
+        self.app = app
+        self.token = token
+        self.directory = directory
+        self.interval = interval
+
+    def _requested(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                return authorized(self.token, value.decode("latin-1"))
+        if PROFILE_QUERY_PARAM.encode() in scope.get("query_string", b""):
+            query = dict(parse_qsl(scope["query_string"].decode("utf-8", "replace")))
+            return authorized(self.token, query.get(PROFILE_QUERY_PARAM))
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        profile = Profile(asyncio.current_task(), self.interval)
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        token = active_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            active_profile.reset(token)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(profile_path(self.directory, profile_id), "w") as f:
+                f.write(profile.folded())
@@ -0,0 +1,137 @@
+"""
+Per-request database statement counting.
+
+SQLAlchemy cursor events on the engine count every statement and its
+database time into the ``QueryStats`` of the current request, which
+``QueryStatsMiddleware`` installs in a context variable. At the end of each
+request the totals are added to ``acbc_db_statements_total`` and
+``acbc_db_seconds_total`` per route; with ``DEBUG_QUERY_HEADERS`` they are
+also sent as ``X-DB-Statements`` and ``Server-Timing`` response headers.
+
+``count_queries`` and ``assert_max_queries`` count statements around any
+block of code, for query-budget checks (see
+``backend/benchmarks/query_budget.py``).
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .database import engine
+from .metrics import Counter
+from .request_metrics import route_name
+
+_requests = Counter("acbc_db_requests_total", "Requests counted for database statements, per route.", ("route",))
+_statements = Counter("acbc_db_statements_total", "Database statements executed, per route.", ("route",))
+_seconds = Counter("acbc_db_seconds_total", "Time spent in database statements, per route.", ("route",))
+
+
+class QueryStats:
+    """Statements executed and time spent in the database."""
+
+    def __init__(self, record: bool = False, parent: Optional["QueryStats"] = None):
+        self.statements = 0
+        self.seconds = 0.0
+        # SQL of each statement, kept only when asked for (budget checks)
+        self.sql: Optional[List[str]] = [] if record else None
+        # Enclosing counter (e.g. count_queries around an in-process request)
+        self.parent = parent
+
+    def add(self, statement: str, seconds: float) -> None:
+        stats = self
+        while stats is not None:
+            stats.statements += 1
+            stats.seconds += seconds
+            if stats.sql is not None:
+                stats.sql.append(statement)
+            stats = stats.parent
+
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    stats.add(statement, time.perf_counter() - started.pop() if started else 0.0)
+
+
+@contextmanager
+def count_queries(record: bool = True) -> Iterator[QueryStats]:
+    """Count the statements executed inside the ``with`` block (by this task and tasks it starts).
+
+    Blocks nest: statements also count towards every enclosing counter,
+    including one around an in-process request.
+    """
+    stats = QueryStats(record, _current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_statements: int, label: str = "block") -> Iterator[QueryStats]:
+    """Raise ``AssertionError`` listing the statements when the block executes more than ``max_statements``."""
+    with count_queries() as stats:
+        yield stats
+    if stats.statements > max_statements:
+        listing = "\n".join(f"  {i}. {' '.join(sql.split())[:200]}" for i, sql in enumerate(stats.sql, 1))
+        raise AssertionError(f"{label} executed {stats.statements} statements (budget {max_statements}):\n{listing}")
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware counting the database statements of each request.
+
+    Must be added before middleware that copies the scope (e.g.
+    ``QueryNormalizationMiddleware``), so the matched route is visible here.
+
+    Args:
+        app: The wrapped ASGI application
+        headers: Send ``X-DB-Statements`` and ``Server-Timing`` headers
+    """
+
+    def __init__(self, app: ASGIApp, headers: bool = False):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(parent=_current.get())
+        token = _current.set(stats)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Statements run while a streamed body is produced are not included
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Statements"] = str(stats.statements)
+                headers.append("Server-Timing", f'db;dur={stats.seconds * 1000:.2f};desc="{stats.statements} statements"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers if self.headers else send)
+        finally:
+            _current.reset(token)
+            route = route_name(scope)
+            _requests.inc(route=route)
+            _statements.inc(stats.statements, route=route)
+            _seconds.inc(stats.seconds, route=route)
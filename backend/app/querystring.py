@@ -0,0 +1,137 @@
+"""
+Tolerant query-string normalisation.
+
+Survey platforms and hand-written integrations send malformed URLs: a
+percent-encoded query (``session_id%3Dabc%26task_number%3D2``), doubled
+``=``, HTML-escaped ``&amp;`` separators, stray whitespace, a second ``?``
+instead of ``&``, or the query appended to the path
+(``/choice/session_id=abc``, ``/design%3Fsession_id=abc``).
+
+``QueryNormalizationMiddleware`` rewrites such requests once, before routing,
+into a clean path and a standard query string, so handlers declare ordinary
+typed ``Query`` parameters. Rewrites are kept in a small LRU cache keyed on
+the raw path and query, so it only saves work when a client repeats the
+exact same malformed URL (e.g. polling the same task); a new session ID or
+task number is a miss.
+
+As before this middleware existed, a literal ``+`` in a value is read as
+``+``, not as a space: clean queries have it escaped to ``%2B``.
+"""
+
+import re
+from collections import OrderedDict
+from typing import List, Tuple
+from urllib.parse import quote, unquote, unquote_plus, urlencode
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .metrics import Counter
+from .tracing import span
+
+# Anything a well-formed query produced by a browser or HTTP client lacks.
+_SUSPECT_QUERY = re.compile(rb"==|&amp;|\?|%3[dD]|%26|^[&\s]|\s|(?:^|&)(?:%20|\+)")
+_SUSPECT_PATH = re.compile(r"[?=\s]|/$")
+_ENCODED_SEPARATOR = re.compile(r"%3[dD]|%26")
+_SEPARATORS = re.compile(r"&amp;|[&?]")
+_KEY = re.compile(r"[A-Za-z_][A-Za-z0-9_]*$")
+
+_normalized = Counter(
+    "acbc_query_normalized_total", "Requests whose path or query string was rewritten.", ("cached",)
+)
+
+
+def normalize_query(query: str) -> List[Tuple[str, str]]:
+    """
+    Parse a possibly malformed query string into ``(key, value)`` pairs.
+
+    Args:
+        query: Raw query string (without the leading ``?``)
+
+    Returns:
+        Decoded pairs in order, keeping the first value of a repeated key
+    """
+    if _ENCODED_SEPARATOR.search(query):
+        # Separators were percent-encoded along with the values
+        query = unquote(query)
+    pairs: List[Tuple[str, str]] = []
+    seen = set()
+    for part in _SEPARATORS.split(query):
+        key, sep, value = part.partition("=")
+        if not sep:
+            continue
+        match = _KEY.search(unquote_plus(key).strip())
+        if not match or match.group() in seen:
+            continue
+        seen.add(match.group())
+        # ``unquote`` keeps a literal "+" in the value
+        pairs.append((match.group(), unquote(value.lstrip("=")).strip()))
+    return pairs
+
+
+def normalize_path(path: str) -> Tuple[str, str]:
+    """
+    Split a query smuggled into the (decoded) path off it.
+
+    Returns:
+        ``(path, query)`` where ``query`` is the recovered query text, if any
+    """
+    path, _, query = path.partition("?")
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        if "=" in segment:
+            query = "&".join(filter(None, ["/".join(segments[i:]), query]))
+            segments = segments[:i]
+            break
+    path = "/".join(segment.strip() for segment in segments).rstrip("/")
+    return path or "/", query
+
+
+class QueryNormalizationMiddleware:
+    """
+    ASGI middleware rewriting malformed paths and query strings before routing.
+
+    Args:
+        app: The wrapped ASGI application
+        cache_size: Number of recent raw → normalised rewrites to keep
+    """
+
+    def __init__(self, app: ASGIApp, cache_size: int = 1024):
+        self.app = app
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, bytes], Tuple[str, bytes]]" = OrderedDict()
+
+    def _normalize(self, path: str, query_string: bytes) -> Tuple[str, bytes]:
+        key = (path, query_string)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            _normalized.inc(cached="true")
+            return cached
+
+        path, extra = normalize_path(path)
+        query = query_string.decode("utf-8", "replace")
+        if extra:
+            query = f"{extra}&{query}" if query else extra
+        result = (path, urlencode(normalize_query(query)).encode("ascii"))
+
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        _normalized.inc(cached="false")
+        return result
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            path = scope["path"]
+            query_string = scope.get("query_string", b"")
+            if (path != "/" and _SUSPECT_PATH.search(path)) or _SUSPECT_QUERY.search(query_string):
+                with span("querystring.normalize"):
+                    new_path, new_query = self._normalize(path, query_string)
+                scope = dict(scope, query_string=new_query)
+                if new_path != path:
+                    scope["path"] = new_path
+                    scope["raw_path"] = quote(new_path).encode("ascii")
+            elif b"+" in query_string:
+                # Starlette would read it as a space
+                scope = dict(scope, query_string=query_string.replace(b"+", b"%2B"))
+        await self.app(scope, receive, send)
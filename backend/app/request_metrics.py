@@ -0,0 +1,62 @@
+"""
+Request latency metrics.
+
+``RequestMetricsMiddleware`` observes the duration of every HTTP request in
+``acbc_http_request_duration_seconds``, labelled with the matched route
+template (not the raw path, so session IDs do not create new series), the
+method and the response status.
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import Histogram
+
+_duration = Histogram(
+    "acbc_http_request_duration_seconds",
+    "Time to answer HTTP requests, per route, method and status.",
+    ("route", "method", "status"),
+)
+
+
+def route_name(scope: Scope) -> str:
+    """Path template of the route that handled the request, or ``unmatched``."""
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing each request until its response is complete.
+
+    Must be added before middleware that copies the scope (e.g.
+    ``QueryNormalizationMiddleware``), so the matched route is visible here.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _duration.observe(
+                time.perf_counter() - started,
+                route=route_name(scope),
+                method=scope["method"],
+                status=str(status),
+            )
@@ -2,4 +2,24 @@
 Routers package.
 
 This package contains all API route modules.
-""" 
\ No newline at end of file
+"""
+
+from typing import Callable
+
+from fastapi.routing import APIRoute
+
+from ..tracing import span
+
+
+class TracedRoute(APIRoute):
+    """``APIRoute`` running its handler (validation, dependencies, endpoint, serialization) in a span."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        span_name = f"route {self.path}"
+
+        async def traced_handler(request):
+            with span(span_name):
+                return await handler(request)
+
+        return traced_handler
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from ..config import PROFILE_DIR, PROFILE_TOKEN
+from ..profiling import PROFILE_ID, authorized, profile_path
+from . import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+    """A stored request profile in the folded-stack format; needs the profiling token in ``X-Profile``."""
+    if not authorized(PROFILE_TOKEN, x_profile):
+        # Profiling disabled or wrong token; do not reveal which
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not PROFILE_ID.match(profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    try:
+        with open(profile_path(PROFILE_DIR, profile_id)) as f:
+            return PlainTextResponse(f.read())
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Profile not found")
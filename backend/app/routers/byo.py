@@ -1,33 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Dict, List, Any
 import json
-import re
-from urllib.parse import unquote
-from ..schemas import BYOConfig
-from ..services import create_session_record, init_screening
+from urllib.parse import unquote_plus
+from ..config import BATCH_MAX_SESSIONS
+from ..schemas import BYOConfig, BYOBatchIn
+from ..serialization import ndjson_lines
+from ..services import create_session_record, create_sessions_batch, init_screening
 from ..database import get_db
+from . import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 @router.post("")
 async def byo_config(config: BYOConfig, db: AsyncSession = Depends(get_db)):
     """Create a new BYO configuration and session."""
     try:
-        # Validate selected_attributes
-        if not config.selected_attributes:
-            raise HTTPException(
-                status_code=422, 
-                detail="selected_attributes is required and cannot be empty"
-            )
-        
-        # Validate that each attribute has at least one value
-        for attr_name, attr_values in config.selected_attributes.items():
-            if not attr_values or len(attr_values) == 0:
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"Attribute '{attr_name}' must have at least one value"
-                )
+        _validate_selected_attributes(config.selected_attributes)
         
         sid = await create_session_record(config, db)
         await init_screening(db, sid, config.selected_attributes)
@@ -38,30 +28,57 @@ async def byo_config(config: BYOConfig, db: AsyncSession = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _validate_selected_attributes(selected_attributes: Dict[str, List[Any]]):
+    """Raise 422 unless every attribute has at least one value."""
+    if not selected_attributes:
+        raise HTTPException(
+            status_code=422, 
+            detail="selected_attributes is required and cannot be empty"
+        )
+    
+    for attr_name, attr_values in selected_attributes.items():
+        if not attr_values or len(attr_values) == 0:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Attribute '{attr_name}' must have at least one value"
+            )
+
+@router.post("/batch")
+async def byo_config_batch(batch: BYOBatchIn):
+    """Create many sessions at once, streaming session IDs back as they are committed.
+    
+    Accepts either a list of BYO configs or one config and a count.
+    """
+    if batch.configs is not None and batch.config is None and batch.count is None:
+        configs = batch.configs
+    elif batch.config is not None and batch.configs is None:
+        count = batch.count if batch.count is not None else 1
+        if count > 1 and batch.config.session_id:
+            raise HTTPException(status_code=422, detail="session_id cannot be set when count is greater than 1")
+        configs = [batch.config] * count
+    else:
+        raise HTTPException(status_code=422, detail="Provide either configs, or config with an optional count")
+    
+    if not configs:
+        raise HTTPException(status_code=422, detail="At least one session must be requested")
+    if len(configs) > BATCH_MAX_SESSIONS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_SESSIONS} sessions can be created per batch")
+    
+    for config in configs:
+        _validate_selected_attributes(config.selected_attributes)
+    
+    return StreamingResponse(ndjson_lines(create_sessions_batch(configs)), media_type="application/x-ndjson")
+
 @router.get("")
 async def byo_config_get(
-    request: Request,
+    session_id: Optional[str] = Query(None),
+    selected_attributes: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
-    """Handle GET request with query parameters, including malformed ones."""
+    """Create a session from query parameters (``selected_attributes`` as JSON)."""
     try:
-        # Get the full URL and decode it
-        full_url = str(request.url)
-        decoded_url = unquote(full_url)
-        
-        # Extract session_id
-        session_id = None
-        session_match = re.search(r'session_id=([^&\s]+)', decoded_url)
-        if session_match:
-            session_id = session_match.group(1)
-            if session_id == "null":
-                session_id = None
-        
-        # Extract selected_attributes
-        selected_attributes = None
-        attr_match = re.search(r'selected_attributes=([^&\s]+)', decoded_url)
-        if attr_match:
-            selected_attributes = attr_match.group(1)
+        if session_id == "null":
+            session_id = None
         
         if not selected_attributes:
             raise HTTPException(status_code=400, detail="selected_attributes parameter is required")
@@ -70,10 +87,9 @@ async def byo_config_get(
         try:
             attributes_dict = json.loads(selected_attributes)
         except json.JSONDecodeError:
-            from urllib.parse import unquote_plus
+            # Some clients encode the JSON twice
             try:
-                decoded_attributes = unquote_plus(selected_attributes)
-                attributes_dict = json.loads(decoded_attributes)
+                attributes_dict = json.loads(unquote_plus(selected_attributes))
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid JSON in selected_attributes")
         
@@ -87,58 +103,7 @@ async def byo_config_get(
         await init_screening(db, sid, config.selected_attributes)
         return {"session_id": sid}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/{path:path}")
-async def byo_config_catch_all(
-    path: str,
-    request: Request,
-    db: AsyncSession = Depends(get_db)
-):
-    """Catch-all route for malformed URLs with spaces."""
-    try:
-        # Get the full URL and decode it
-        full_url = str(request.url)
-        decoded_url = unquote(full_url)
-        
-        # Extract session_id
-        session_id = None
-        session_match = re.search(r'session_id=([^&\s]+)', decoded_url)
-        if session_match:
-            session_id = session_match.group(1)
-            if session_id == "null":
-                session_id = None
-        
-        # Extract selected_attributes
-        selected_attributes = None
-        attr_match = re.search(r'selected_attributes=([^&\s]+)', decoded_url)
-        if attr_match:
-            selected_attributes = attr_match.group(1)
-        
-        if not selected_attributes:
-            raise HTTPException(status_code=400, detail="selected_attributes parameter is required")
-        
-        # Parse the selected_attributes JSON string robustly
-        try:
-            attributes_dict = json.loads(selected_attributes)
-        except json.JSONDecodeError:
-            from urllib.parse import unquote_plus
-            try:
-                decoded_attributes = unquote_plus(selected_attributes)
-                attributes_dict = json.loads(decoded_attributes)
-            except json.JSONDecodeError:
-                raise HTTPException(status_code=400, detail="Invalid JSON in selected_attributes")
-        
-        # Create BYOConfig object
-        config = BYOConfig(
-            session_id=session_id,
-            selected_attributes=attributes_dict
-        )
-        
-        sid = await create_session_record(config, db)
-        await init_screening(db, sid, config.selected_attributes)
-        return {"session_id": sid}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
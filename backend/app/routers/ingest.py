@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from ..serialization import ndjson_lines
+from ..services import ingest_offline_respondents
+from . import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves ``receive`` to the content generator.
+    
+    The default implementation listens for client disconnects on
+    ``receive``, which would consume the request body that the generator
+    is still reading while it streams progress back.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+@router.post("/respondents")
+async def ingest_respondents(request: Request):
+    """Ingest complete offline respondent records sent as NDJSON.
+    
+    Each line holds one respondent (BYO, screening answers, tournament
+    choices). Progress and per-record errors stream back as NDJSON while
+    the upload is processed.
+    """
+    return _DuplexStreamingResponse(
+        ndjson_lines(ingest_offline_respondents(request.stream())),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import JOB_RETRY_AFTER
+from ..schemas import JobIn, JobOut
+from ..services import get_session_state
+from ..jobs import JOB_KINDS, job_runner, job_status
+from ..database import get_db
+from . import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+async def _get_job(job_id: str):
+    job = await job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("", response_model=JobOut, status_code=202)
+async def submit_job(body: JobIn, db: AsyncSession = Depends(get_db)):
+    """Queue a design or estimation job; poll the ``Location`` URL for its status."""
+    try:
+        if body.kind not in JOB_KINDS:
+            raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(JOB_KINDS)}")
+        if body.kind == "tournament_task" and not body.task_number:
+            raise HTTPException(status_code=400, detail="task_number is required for tournament_task jobs")
+        if not await get_session_state(db, body.session_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        params = {"session_id": body.session_id, "n_options": body.n_options}
+        if body.kind == "tournament_task":
+            params["task_number"] = body.task_number
+        job = await job_runner.submit(body.kind, params)
+        return ORJSONResponse(
+            job_status(job),
+            status_code=202,
+            headers={"Location": f"/api/jobs/{job.id}", "Retry-After": str(JOB_RETRY_AFTER)},
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/{job_id}", response_model=JobOut)
+async def get_job(job_id: str):
+    """Status of a job."""
+    try:
+        return ORJSONResponse(job_status(await _get_job(job_id)))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a finished job.
+    
+    Answers 202 with ``Retry-After`` while the job is queued or running and
+    409 with the error once it has failed.
+    """
+    try:
+        job = await _get_job(job_id)
+        if job.status == "succeeded":
+            return ORJSONResponse(job.result)
+        if job.status == "failed":
+            raise HTTPException(status_code=409, detail=f"Job failed: {job.error}")
+        return ORJSONResponse(
+            job_status(job), status_code=202, headers={"Retry-After": str(JOB_RETRY_AFTER)}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
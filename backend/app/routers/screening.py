@@ -1,72 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
-import re
-from urllib.parse import unquote
+from typing import List, Optional
+from ..compression import COMPACT_MEDIA_TYPE, compact_screening, wants_compact
+from ..config import SCREENING_CACHE_CONTROL
+from ..http_cache import cache_headers, etag_matches, make_etag, not_modified
 from ..schemas import ScreeningDesignOut, ScreeningResponseIn
-from ..services import get_session, get_session_with_screening_tasks, init_screening, record_screening_responses
+from ..services import (
+    get_session_state,
+    get_screening_tasks,
+    get_screening_versions,
+    init_screening,
+    record_screening_responses,
+)
 from ..database import get_db
 from .. import models
+from . import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
+
+def _screening_etag(session_id: str, versions, compact: bool) -> str:
+    # The concepts never change; the responses change once when submitted.
+    return make_etag("screening", session_id, versions, "compact" if compact else "full")
+
+async def _screening_design(request: Request, db: AsyncSession, session_id: str):
+    """Screening design with ETag; answers 304 without loading concepts when unchanged.
+    
+    Rows come straight from the database, so they are serialized without
+    validating them against ``ScreeningDesignOut`` again.
+    """
+    compact = wants_compact(request)
+    if request.headers.get("if-none-match"):
+        versions = await get_screening_versions(db, session_id)
+        if versions:
+            etag = _screening_etag(session_id, versions, compact)
+            if etag_matches(request, etag):
+                return not_modified(etag, SCREENING_CACHE_CONTROL)
+    
+    tasks = await get_screening_tasks(db, session_id)
+    # Every session gets its screening tasks on creation; only check the session otherwise
+    if not tasks and not await get_session_state(db, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    etag = _screening_etag(session_id, [(t.id, t.response) for t in tasks], compact)
+    headers = cache_headers(etag, SCREENING_CACHE_CONTROL)
+    rows = [{"id": t.id, "concept": t.concept, "position": t.position, "response": t.response} for t in tasks]
+    if compact:
+        return ORJSONResponse(compact_screening(rows), media_type=COMPACT_MEDIA_TYPE, headers=headers)
+    return ORJSONResponse(rows, headers=headers)
 
 @router.get("/design", response_model=List[ScreeningDesignOut])
 async def screening_design(
     request: Request,
+    session_id: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
     """Get screening design for a session."""
     try:
-        # Get the full URL and decode it
-        full_url = str(request.url)
-        decoded_url = unquote(full_url)
-        
-        # Extract session_id from URL
-        session_id = None
-        session_match = re.search(r'session_id=+([^&\s]+)', decoded_url)
-        if session_match:
-            session_id = session_match.group(1)
-        
         if not session_id:
             raise HTTPException(status_code=400, detail="session_id parameter is required")
         
-        sess = await get_session_with_screening_tasks(db, session_id)
-        if not sess:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        return sess.screening_tasks
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/design/{path:path}")
-async def screening_design_catch_all(
-    path: str,
-    request: Request,
-    db: AsyncSession = Depends(get_db)
-):
-    """Catch-all route for malformed screening design URLs."""
-    try:
-        # Get the full URL and decode it
-        full_url = str(request.url)
-        decoded_url = unquote(full_url)
-        
-        # Extract session_id
-        session_id = None
-        session_match = re.search(r'session_id=+([^&\s]+)', decoded_url)
-        if session_match:
-            session_id = session_match.group(1)
-        
-        if not session_id:
-            raise HTTPException(status_code=400, detail="session_id parameter is required")
-        
-        sess = await get_session_with_screening_tasks(db, session_id)
-        if not sess:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        return sess.screening_tasks
+        return await _screening_design(request, db, session_id)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -75,7 +73,7 @@ async def screening_responses(resp: ScreeningResponseIn, db: AsyncSession = Depe
     """Submit screening responses for a session."""
     try:
         # Check if session exists
-        session = await get_session(db, resp.session_id)
+        session = await get_session_state(db, resp.session_id)
         if not session:
             raise HTTPException(status_code=404, detail=f"Session '{resp.session_id}' not found. Please create a session first using the BYO config endpoint.")
         
@@ -97,7 +95,7 @@ async def screening_responses(resp: ScreeningResponseIn, db: AsyncSession = Depe
                     detail=f"Response at position {i} must be a boolean (true/false), got {type(response).__name__}"
                 )
         
-        await record_screening_responses(db, resp.session_id, resp.responses)
+        await record_screening_responses(db, resp.session_id, resp.responses, tasks)
         return {"status": "ok", "message": f"Successfully recorded {len(resp.responses)} screening responses"}
         
     except HTTPException:
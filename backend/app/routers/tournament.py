@@ -1,97 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from typing import List
-import re
-from urllib.parse import unquote
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..schemas import TournamentDesignOut, ChoiceResponseIn
-from ..services import get_tournament, record_choice, get_session
+from ..compression import COMPACT_MEDIA_TYPE, compact_tournament, compact_tournament_tasks, wants_compact
+from ..config import TOURNAMENT_CACHE_CONTROL
+from ..http_cache import cache_headers, etag_matches, make_etag, not_modified
+from ..schemas import (
+    TournamentDesignOut,
+    ChoiceResponseIn,
+    ChoiceBatchIn,
+    ChoiceBatchOut,
+    ChoiceAndNextOut,
+    TournamentTasksOut,
+)
+from ..services import (
+    get_tournament,
+    get_all_tournament_tasks,
+    record_choice,
+    record_choices,
+    record_choice_and_get_next,
+    get_session_state,
+    tournament_task_exists,
+)
 from ..database import get_db
+from . import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
+
+async def _tournament_choice(request: Request, db: AsyncSession, session_id: str, task_number: int):
+    """Tournament task with ETag; answers 304 without loading concepts when already stored.
+    
+    Concepts are generated or read by the API itself, so they are serialized
+    without validating them against ``TournamentDesignOut`` again.
+    """
+    compact = wants_compact(request)
+    # A stored task never changes, so its identity is its version.
+    etag = make_etag("tournament", session_id, task_number, "compact" if compact else "full")
+    if etag_matches(request, etag) and await tournament_task_exists(db, session_id, task_number):
+        return not_modified(etag, TOURNAMENT_CACHE_CONTROL)
+    
+    if not await get_session_state(db, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    concepts = await get_tournament(db, session_id, task_number)
+    headers = cache_headers(etag, TOURNAMENT_CACHE_CONTROL)
+    if compact:
+        return ORJSONResponse(compact_tournament(task_number, concepts), media_type=COMPACT_MEDIA_TYPE, headers=headers)
+    return ORJSONResponse({"task_number": task_number, "concepts": concepts}, headers=headers)
 
 @router.get("/choice", response_model=TournamentDesignOut)
 async def tournament_choice(
     request: Request,
+    session_id: Optional[str] = Query(None),
+    task_number: int = Query(1),
     db: AsyncSession = Depends(get_db)
 ):
     """Get tournament choice for a session and task number."""
     try:
-        # Get the full URL and decode it
-        full_url = str(request.url)
-        decoded_url = unquote(full_url)
-        
-        # Extract session_id from URL
-        session_id = None
-        session_match = re.search(r'session_id=+([^&\s]+)', decoded_url)
-        if session_match:
-            session_id = session_match.group(1)
-        
         if not session_id:
             raise HTTPException(status_code=400, detail="session_id parameter is required")
         
-        # Extract task_number from URL (default to 1)
-        task_number = 1
-        task_match = re.search(r'task_number=+([^&\s]+)', decoded_url)
-        if task_match:
-            try:
-                task_number = int(task_match.group(1))
-            except ValueError:
-                raise HTTPException(status_code=400, detail="task_number must be an integer")
-        
-        if not await get_session(db, session_id):
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        concepts = await get_tournament(db, session_id, task_number)
-        return {"task_number": task_number, "concepts": concepts}
+        return await _tournament_choice(request, db, session_id, task_number)
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@router.get("/choice/{path:path}")
-async def tournament_choice_catch_all(
-    path: str,
+@router.get("/tasks", response_model=TournamentTasksOut)
+async def tournament_tasks(
     request: Request,
+    session_id: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
-    """Catch-all route for malformed tournament choice URLs."""
+    """Get all planned tournament tasks for a session in one response."""
     try:
-        # Get the full URL and decode it
-        full_url = str(request.url)
-        decoded_url = unquote(full_url)
-        
-        # Extract session_id from URL
-        session_id = None
-        session_match = re.search(r'session_id=+([^&\s]+)', decoded_url)
-        if session_match:
-            session_id = session_match.group(1)
-        
         if not session_id:
             raise HTTPException(status_code=400, detail="session_id parameter is required")
         
-        # Extract task_number from URL (default to 1)
-        task_number = 1
-        task_match = re.search(r'task_number=+([^&\s]+)', decoded_url)
-        if task_match:
-            try:
-                task_number = int(task_match.group(1))
-            except ValueError:
-                raise HTTPException(status_code=400, detail="task_number must be an integer")
-        
-        if not await get_session(db, session_id):
+        if not await get_session_state(db, session_id):
             raise HTTPException(status_code=404, detail="Session not found")
         
-        concepts = await get_tournament(db, session_id, task_number)
-        return {"task_number": task_number, "concepts": concepts}
+        total_tasks, tasks = await get_all_tournament_tasks(db, session_id)
+        if wants_compact(request):
+            return ORJSONResponse(
+                compact_tournament_tasks(session_id, total_tasks, tasks),
+                media_type=COMPACT_MEDIA_TYPE,
+                headers={"Vary": "Accept"},
+            )
+        return ORJSONResponse(
+            {"session_id": session_id, "total_tasks": total_tasks, "tasks": tasks},
+            headers={"Vary": "Accept"},
+        )
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/choice-response")
 async def choice_response(resp: ChoiceResponseIn, db: AsyncSession = Depends(get_db)):
     try:
-        if not await get_session(db, resp.session_id):
+        if not await get_session_state(db, resp.session_id):
             raise HTTPException(404, "Session not found")
         
         next_task = await record_choice(db, resp.session_id, resp.task_number, resp.selected_concept_id)
@@ -100,4 +114,39 @@ async def choice_response(resp: ChoiceResponseIn, db: AsyncSession = Depends(get
     except ValueError as e:
         raise HTTPException(400, str(e))
     except Exception as e:
-        raise HTTPException(500, f"Internal server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@router.post("/choice-responses", response_model=ChoiceBatchOut)
+async def choice_responses(batch: ChoiceBatchIn, db: AsyncSession = Depends(get_db)):
+    """Record an ordered list of choices in one request and one transaction."""
+    try:
+        if not await get_session_state(db, batch.session_id):
+            raise HTTPException(404, "Session not found")
+        
+        next_task, utilities = await record_choices(db, batch.session_id, batch.choices)
+        return {"next_task": next_task, "utilities": utilities}
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@router.post("/choice-and-next", response_model=ChoiceAndNextOut)
+async def choice_and_next(resp: ChoiceResponseIn, db: AsyncSession = Depends(get_db)):
+    """Record a choice and return the next task's concepts in one request."""
+    try:
+        if not await get_session_state(db, resp.session_id):
+            raise HTTPException(404, "Session not found")
+        
+        return ORJSONResponse(
+            await record_choice_and_get_next(db, resp.session_id, resp.task_number, resp.selected_concept_id)
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
@@ -1,10 +1,16 @@
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
+from datetime import datetime
 
 class BYOConfig(BaseModel):
     session_id: Optional[str]
     selected_attributes: Dict[str, List[Any]]
 
+class BYOBatchIn(BaseModel):
+    configs: Optional[List[BYOConfig]] = None
+    config: Optional[BYOConfig] = None
+    count: Optional[int] = None
+
 class ScreeningDesignOut(BaseModel):
     id: int
     concept: Dict[str, Any]
@@ -25,4 +31,59 @@ class TournamentDesignOut(BaseModel):
 class ChoiceResponseIn(BaseModel):
     session_id: str
     task_number: int
-    selected_concept_id: int
\ No newline at end of file
+    selected_concept_id: int
+
+class ChoiceIn(BaseModel):
+    task_number: int
+    selected_concept_id: int
+
+class ChoiceBatchIn(BaseModel):
+    session_id: str
+    choices: List[ChoiceIn]
+
+class ChoiceBatchOut(BaseModel):
+    next_task: int
+    utilities: Dict[str, Dict[str, float]]
+
+class ChoiceAndNextOut(BaseModel):
+    next_task: int
+    complete: bool
+    task_number: Optional[int] = None
+    concepts: Optional[List[Dict[str, Any]]] = None
+
+class TournamentTasksOut(BaseModel):
+    session_id: str
+    total_tasks: int
+    tasks: List[TournamentDesignOut]
+
+class OfflineScreeningAnswer(BaseModel):
+    concept: Dict[str, Any]
+    response: bool
+
+class OfflineTournamentChoice(BaseModel):
+    task_number: int
+    concepts: List[Dict[str, Any]]
+    selected_concept_id: int
+
+class OfflineRespondentIn(BaseModel):
+    session_id: Optional[str] = None
+    selected_attributes: Dict[str, List[Any]]
+    screening: List[OfflineScreeningAnswer]
+    tournament: List[OfflineTournamentChoice] = []
+
+class JobIn(BaseModel):
+    kind: str
+    session_id: str
+    task_number: Optional[int] = None
+    n_options: int = 3
+
+class JobOut(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    params: Dict[str, Any]
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,98 @@
+"""
+Serialization helpers.
+
+JSON is encoded with orjson everywhere: in API responses, in the JSON
+columns of the database and in shared caches. Tournament designs, the most
+common cached value, are stored in a compact columnar form that lists the
+attribute names once instead of repeating them in every concept.
+"""
+
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List
+
+import orjson
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+_JSON = b"J"
+_DESIGN = b"D"
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a JSON-compatible value to bytes."""
+    return orjson.dumps(value, option=_OPTIONS)
+
+
+def loads(data: bytes) -> Any:
+    """Deserialize bytes or a string produced by ``dumps``."""
+    return orjson.loads(data)
+
+
+async def ndjson_lines(values: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    """Encode each value as one line of NDJSON, e.g. for a ``StreamingResponse``."""
+    async for value in values:
+        yield dumps(value) + b"\n"
+
+
+def json_serializer(value: Any) -> str:
+    """``json_serializer`` for the SQLAlchemy engine (JSON columns are text)."""
+    return orjson.dumps(value, option=_OPTIONS).decode()
+
+
+def is_design(value: Any) -> bool:
+    """Whether ``value`` is a list of ``{"id", "attributes"}`` concepts sharing one attribute set."""
+    if not isinstance(value, list) or not value:
+        return False
+    keys = None
+    for concept in value:
+        if not isinstance(concept, dict) or concept.keys() != {"id", "attributes"}:
+            return False
+        attributes = concept["attributes"]
+        if not isinstance(attributes, dict):
+            return False
+        if keys is None:
+            keys = list(attributes)
+        elif list(attributes) != keys:
+            return False
+    return True
+
+
+def pack_design(concepts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert concepts to the compact columnar form.
+
+    Args:
+        concepts: List of ``{"id": int, "attributes": {attribute: level}}``
+
+    Returns:
+        ``{"a": [attribute, ...], "i": [id, ...], "r": [[level, ...], ...]}``
+    """
+    attributes = list(concepts[0]["attributes"])
+    return {
+        "a": attributes,
+        "i": [concept["id"] for concept in concepts],
+        "r": [[concept["attributes"][attr] for attr in attributes] for concept in concepts],
+    }
+
+
+def unpack_design(packed: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Inverse of ``pack_design``."""
+    attributes = packed["a"]
+    return [
+        {"id": concept_id, "attributes": dict(zip(attributes, row))}
+        for concept_id, row in zip(packed["i"], packed["r"])
+    ]
+
+
+def encode_value(value: Any) -> bytes:
+    """Serialize a cache value, packing designs into the compact form."""
+    if is_design(value):
+        return _DESIGN + dumps(pack_design(value))
+    return _JSON + dumps(value)
+
+
+def decode_value(data: bytes) -> Any:
+    """Inverse of ``encode_value``."""
+    tag, payload = data[:1], data[1:]
+    if tag == _DESIGN:
+        return unpack_design(loads(payload))
+    return loads(payload)
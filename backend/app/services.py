@@ -1,55 +1,462 @@
+import asyncio
+import functools
 import uuid
 from typing import List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, update
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from . import models, schemas, utils
-from .database import get_db
+from . import config, models, schemas, utils
+from .admission import prefetch_limiter, tournament_limiter
+from .degradation import INLINE_ALGORITHMS, design_policy
+from .cache import Cache
+from .executor import run_design, run_in_process_pool, submit_design
+from .metrics import stage
+from .serialization import dumps, loads
+from .database import AsyncSessionLocal, get_db
+from .singleflight import SingleFlight
+from .speculation import speculator
+from .tracing import traced
 
+# State of active sessions ({"byo_config": ..., "utilities": ...}) kept
+# between the requests of one respondent. Writes go through to the cache.
+session_cache = Cache("session_state", ttl=config.SESSION_CACHE_TTL, enabled=config.SESSION_CACHE_ENABLED)
+# Stored tournament concepts keyed by (session_id, task_number).
+design_cache = Cache("design", ttl=config.DESIGN_CACHE_TTL, enabled=config.DESIGN_CACHE_ENABLED)
+
+# Coalesces double-fired requests for the same (session_id, task_number).
+tournament_flight = SingleFlight("tournament")
+# Coalesces concurrent requests for all tournament tasks of one session.
+tournament_tasks_flight = SingleFlight("tournament_tasks")
+
+@traced()
 async def create_session_record(byo: schemas.BYOConfig, db: AsyncSession) -> str:
     sid = byo.session_id or str(uuid.uuid4())
     session = models.Session(id=sid, byo_config=byo.selected_attributes)
     db.add(session)
-    await db.commit()
+    with stage("commit"):
+        await db.commit()
+    await session_cache.set(sid, {"byo_config": _as_stored(session.byo_config), "utilities": None})
     return sid
 
-async def get_session(db: AsyncSession, sid: str):
-    result = await db.execute(select(models.Session).where(models.Session.id == sid))
-    return result.scalar_one_or_none()
+async def create_sessions_batch(byos: List[schemas.BYOConfig]):
+    """Create sessions and their screening matrices in bulk.
+
+    Screening generation for every chunk is started on the process pool up
+    front; chunks are then bulk-inserted and committed in order, each in its
+    own transaction. Sessions created this way are not put in the session
+    cache. The generator opens its own database session so it can outlive
+    the request's dependencies while the response streams.
+
+    Yields:
+        ``{"session_id": ...}`` for each committed session,
+        ``{"error": ..., "session_ids": [...]}`` for each failed chunk and
+        finally ``{"created": n, "failed": n}``
+    """
+    chunk_size = config.BATCH_CHUNK_SIZE
+    chunks = [byos[i:i + chunk_size] for i in range(0, len(byos), chunk_size)]
+    matrices = [
+        asyncio.ensure_future(
+            run_in_process_pool(utils.generate_screening_matrices, [byo.selected_attributes for byo in chunk])
+        )
+        for chunk in chunks
+    ]
+    created = failed = 0
+    try:
+        async with AsyncSessionLocal() as db:
+            for chunk, chunk_matrices in zip(chunks, matrices):
+                sids = [byo.session_id or str(uuid.uuid4()) for byo in chunk]
+                try:
+                    with stage("screening_generation"):
+                        tasks = await chunk_matrices
+                    await db.execute(
+                        insert(models.Session),
+                        [{"id": sid, "byo_config": byo.selected_attributes} for sid, byo in zip(sids, chunk)],
+                    )
+                    await db.execute(
+                        insert(models.ScreeningTask),
+                        [
+                            {"session_id": sid, "concept": concept, "position": idx}
+                            for sid, concepts in zip(sids, tasks)
+                            for idx, concept in enumerate(concepts, start=1)
+                        ],
+                    )
+                    with stage("commit"):
+                        await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    failed += len(chunk)
+                    # Report the driver error without the (large) failed statement
+                    yield {"error": str(getattr(e, "orig", e)), "session_ids": sids}
+                    continue
+                created += len(chunk)
+                for sid in sids:
+                    yield {"session_id": sid}
+        yield {"created": created, "failed": failed}
+    finally:
+        for pending in matrices:
+            pending.cancel()
+
+def _offline_respondent_rows(record: schemas.OfflineRespondentIn):
+    """Validate an offline respondent record and build its rows.
+
+    Utilities are computed exactly as the online flow would: initial
+    estimates from the screening answers, then one adaptive update per
+    tournament choice in task order.
+
+    Returns:
+        ``(session_row, screening_rows, tournament_rows)`` as dicts for bulk inserts
+    """
+    byo = record.selected_attributes
+    if not byo:
+        raise ValueError("selected_attributes is required and cannot be empty")
+    for attr_name, attr_values in byo.items():
+        if not attr_values:
+            raise ValueError(f"Attribute '{attr_name}' must have at least one value")
+    if not record.screening:
+        raise ValueError("At least one screening answer is required")
+    for position, answer in enumerate(record.screening, start=1):
+        for attr, level in answer.concept.items():
+            if attr not in byo or level not in byo[attr]:
+                raise ValueError(f"Screening concept {position} uses unknown level {attr}={level!r}")
+    
+    sid = record.session_id or str(uuid.uuid4())
+    utilities = utils.estimate_initial_utilities(
+        [answer.response for answer in record.screening],
+        [answer.concept for answer in record.screening],
+    )
+    
+    tournament_rows = []
+    for choice in sorted(record.tournament, key=lambda c: c.task_number):
+        if any(row["task_number"] == choice.task_number for row in tournament_rows):
+            raise ValueError(f"Tournament task {choice.task_number} appears more than once")
+        if choice.task_number < 1:
+            raise ValueError(f"Invalid tournament task number {choice.task_number}")
+        concepts = _normalize_concepts(list(choice.concepts))
+        if not all(isinstance(concept.get("attributes"), dict) for concept in concepts):
+            raise ValueError(f"Tournament task {choice.task_number} has concepts without attributes")
+        for concept in concepts:
+            for attr, level in concept["attributes"].items():
+                if attr not in byo or level not in byo[attr]:
+                    raise ValueError(f"Tournament task {choice.task_number} uses unknown level {attr}={level!r}")
+        if choice.selected_concept_id < 0 or choice.selected_concept_id >= len(concepts):
+            raise ValueError(
+                f"Invalid choice_id {choice.selected_concept_id} for task {choice.task_number}. "
+                f"Must be between 0 and {len(concepts) - 1}"
+            )
+        utilities = utils.adaptive_update(utilities, concepts[choice.selected_concept_id]["attributes"])
+        tournament_rows.append({
+            "session_id": sid,
+            "task_number": choice.task_number,
+            "concepts": concepts,
+            "choice": choice.selected_concept_id,
+            "algorithm": "offline",
+        })
+    
+    session_row = {"id": sid, "byo_config": byo, "utilities": utilities}
+    screening_rows = [
+        {"session_id": sid, "concept": answer.concept, "position": position, "response": answer.response}
+        for position, answer in enumerate(record.screening, start=1)
+    ]
+    return session_row, screening_rows, tournament_rows
+
+async def _ndjson_lines(chunks):
+    """Split a stream of byte chunks into non-empty lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def _insert_offline_rows(db: AsyncSession, rows):
+    """Bulk-insert the rows built by ``_offline_respondent_rows`` for several records."""
+    await db.execute(insert(models.Session), [row[1] for row in rows])
+    await db.execute(insert(models.ScreeningTask), [r for row in rows for r in row[2]])
+    tournament_rows = [r for row in rows for r in row[3]]
+    if tournament_rows:
+        await db.execute(insert(models.TournamentTask), tournament_rows)
+
+async def ingest_offline_respondents(chunks):
+    """Ingest a streamed NDJSON batch of complete offline respondent records.
 
-async def get_session_with_screening_tasks(db: AsyncSession, sid: str):
-    """Get session with screening tasks explicitly loaded."""
+    Records are validated one by one; valid ones are bulk-inserted in
+    chunks of ``BATCH_CHUNK_SIZE`` records, one transaction per chunk.
+    Invalid records are reported and skipped without aborting the batch.
+    If a chunk still fails to insert, its records are retried one per
+    transaction, so only the records the database rejects are reported.
+
+    Args:
+        chunks: Async iterable of raw request body chunks
+
+    Yields:
+        ``{"line", "session_id", "error"}`` per rejected record,
+        ``{"committed", "lines_read"}`` after each committed chunk and
+        finally ``{"received", "ingested", "failed"}``
+    """
+    received = ingested = failed = 0
+    pending = []  # (line_number, session_row, screening_rows, tournament_rows)
+    
+    async with AsyncSessionLocal() as db:
+        async def flush():
+            nonlocal ingested, failed
+            sids = [row[1]["id"] for row in pending]
+            existing = set((await db.execute(
+                select(models.Session.id).where(models.Session.id.in_(sids))
+            )).scalars())
+            events, rows, seen = [], [], set()
+            for line_number, session_row, screening_rows, tournament_rows in pending:
+                sid = session_row["id"]
+                if sid in existing or sid in seen:
+                    failed += 1
+                    events.append({"line": line_number, "session_id": sid, "error": f"Session {sid} already exists"})
+                    continue
+                seen.add(sid)
+                rows.append((line_number, session_row, screening_rows, tournament_rows))
+            pending.clear()
+            if not rows:
+                return events
+            try:
+                await _insert_offline_rows(db, rows)
+                with stage("commit"):
+                    await db.commit()
+                ingested += len(rows)
+            except Exception:
+                await db.rollback()
+                for row in rows:
+                    try:
+                        await _insert_offline_rows(db, [row])
+                        with stage("commit"):
+                            await db.commit()
+                    except Exception as e:
+                        await db.rollback()
+                        failed += 1
+                        # Report the driver error without the failed statement
+                        events.append({"line": row[0], "session_id": row[1]["id"], "error": str(getattr(e, "orig", e))})
+                        continue
+                    ingested += 1
+            events.append({"committed": ingested, "lines_read": received})
+            return events
+        
+        async for line in _ndjson_lines(chunks):
+            received += 1
+            try:
+                record = schemas.OfflineRespondentIn.model_validate_json(line)
+                pending.append((received, *_offline_respondent_rows(record)))
+            except Exception as e:
+                failed += 1
+                yield {"line": received, "session_id": None, "error": str(e)}
+                continue
+            if len(pending) >= config.BATCH_CHUNK_SIZE:
+                for event in await flush():
+                    yield event
+        if pending:
+            for event in await flush():
+                yield event
+    
+    yield {"received": received, "ingested": ingested, "failed": failed}
+
+@traced()
+async def get_session_state(db: AsyncSession, sid: str):
+    """Get the BYO config and utilities of a session, from the cache when possible.
+
+    The returned dict is shared with the cache and must not be mutated.
+    """
+    with stage("session_load"):
+        state = await session_cache.get(sid)
+        if state is not None:
+            return state
+        result = await db.execute(
+            select(models.Session.byo_config, models.Session.utilities).where(models.Session.id == sid)
+        )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    state = {"byo_config": row.byo_config, "utilities": row.utilities}
+    await session_cache.set(sid, state)
+    return state
+
+async def _session_state_for_update(db: AsyncSession, sid: str):
+    """Get the BYO config and utilities of a session from the database, for a write.
+
+    Writes never start from the session cache: another worker may have
+    updated the utilities since they were cached, and writing over them
+    would lose that update. The row stays locked until the transaction
+    ends, on databases that support ``SELECT ... FOR UPDATE``.
+    """
+    with stage("session_load"):
+        result = await db.execute(
+            select(models.Session.byo_config, models.Session.utilities)
+            .where(models.Session.id == sid)
+            .with_for_update()
+        )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return {"byo_config": row.byo_config, "utilities": row.utilities}
+
+def _as_stored(value):
+    """``value`` as the JSON columns return it, e.g. with numeric level keys turned into strings.
+
+    Values written through to the session cache must equal what a cold
+    read from the database returns, or designs would depend on the cache.
+    """
+    return loads(dumps(value))
+
+async def _update_utilities(db: AsyncSession, sid: str, state: Dict[str, Any], utilities: Dict[str, Any]):
+    """Write new utilities for a session without committing; returns the new state."""
+    utilities = _as_stored(utilities)
+    await db.execute(
+        update(models.Session).where(models.Session.id == sid).values(utilities=utilities)
+    )
+    return {"byo_config": state["byo_config"], "utilities": utilities}
+
+async def _commit_session_state(db: AsyncSession, sid: str, state: Dict[str, Any]):
+    """Commit the transaction and write the session state through to the cache."""
+    try:
+        with stage("commit"):
+            await db.commit()
+    except Exception:
+        await session_cache.invalidate(sid)
+        raise
+    await session_cache.set(sid, state)
+
+async def get_screening_tasks(db: AsyncSession, sid: str):
+    """Get a session's screening task rows ordered by ID, without loading the session."""
+    result = await db.execute(
+        select(
+            models.ScreeningTask.id,
+            models.ScreeningTask.concept,
+            models.ScreeningTask.position,
+            models.ScreeningTask.response,
+        )
+        .where(models.ScreeningTask.session_id == sid)
+        .order_by(models.ScreeningTask.id)
+    )
+    return result.all()
+
+async def get_screening_versions(db: AsyncSession, sid: str):
+    """Get ``(id, response)`` of a session's screening tasks without loading the concepts."""
     result = await db.execute(
-        select(models.Session)
-        .options(selectinload(models.Session.screening_tasks))
-        .where(models.Session.id == sid)
+        select(models.ScreeningTask.id, models.ScreeningTask.response)
+        .where(models.ScreeningTask.session_id == sid)
+        .order_by(models.ScreeningTask.id)
     )
-    return result.scalar_one_or_none()
+    return [tuple(row) for row in result.all()]
 
+async def tournament_task_exists(db: AsyncSession, sid: str, task_number: int) -> bool:
+    """Whether a tournament task has been stored, without loading its concepts."""
+    result = await db.execute(
+        select(models.TournamentTask.id)
+        .where(models.TournamentTask.session_id == sid)
+        .where(models.TournamentTask.task_number == task_number)
+        .limit(1)
+    )
+    return result.first() is not None
+
+@traced()
 async def init_screening(db: AsyncSession, sid: str, byo: Dict[str, List[Any]]):
-    tasks = utils.generate_screening_matrix(byo)
-    for idx, concept in enumerate(tasks, start=1):
-        db.add(models.ScreeningTask(session_id=sid, concept=concept, position=idx))
-    await db.commit()
+    with stage("screening_generation"):
+        tasks = utils.generate_screening_matrix(byo)
+    # One executemany instead of an INSERT ... RETURNING per task
+    await db.execute(
+        insert(models.ScreeningTask),
+        [{"session_id": sid, "concept": concept, "position": idx} for idx, concept in enumerate(tasks, start=1)],
+    )
+    with stage("commit"):
+        await db.commit()
     return tasks
 
-async def record_screening_responses(db: AsyncSession, sid: str, responses: List[bool]):
-    result = await db.execute(select(models.ScreeningTask).where(models.ScreeningTask.session_id == sid))
-    tasks = result.scalars().all()
+@traced()
+async def record_screening_responses(db: AsyncSession, sid: str, responses: List[bool], tasks=None):
+    """Store screening responses and the utilities estimated from them.
+
+    ``tasks`` are the session's screening task rows, if the caller has
+    already loaded them.
+    """
+    if tasks is None:
+        result = await db.execute(select(models.ScreeningTask).where(models.ScreeningTask.session_id == sid))
+        tasks = result.scalars().all()
     for task, resp in zip(tasks, responses):
         task.response = resp
     
     # Get the session to update utilities
-    session = await get_session(db, sid)
-    if session:
-        # Estimate initial utilities and store them in the session
-        utilities = utils.estimate_initial_utilities(responses, [t.concept for t in tasks])
-        session.utilities = utilities
+    state = await get_session_state(db, sid)
+    if state is None:
+        with stage("commit"):
+            await db.commit()
+        return
     
-    await db.commit()
+    # Estimate initial utilities and store them in the session
+    utilities = utils.estimate_initial_utilities(responses, [t.concept for t in tasks])
+    state = await _update_utilities(db, sid, state, utilities)
+    await _commit_session_state(db, sid, state)
+
+def _normalize_concepts(concepts):
+    """Convert legacy stored concepts to the ``[{"id", "attributes"}]`` structure."""
+    # Handle legacy data structure where concepts might be a single dict instead of list
+    if isinstance(concepts, dict):
+        # Convert old single concept structure to new list structure
+        concepts = [{"id": 0, "attributes": concepts}]
+    elif isinstance(concepts, list):
+        # Ensure each concept has the proper structure
+        for i, concept in enumerate(concepts):
+            if isinstance(concept, dict) and "id" not in concept:
+                # Convert concept without ID to proper structure
+                concepts[i] = {"id": i, "attributes": concept}
+    return concepts
+
+@traced()
+async def get_tournament(
+    db: AsyncSession,
+    sid: str,
+    task_number: int,
+    nso: int = 3,
+    generate=None,
+    session: Dict[str, Any] = None,
+):
+    """Get or create the concepts for a tournament task.
 
-async def get_tournament(db: AsyncSession, sid: str, task_number: int, nso: int = 3):
-    session = await get_session(db, sid)
+    Concurrent calls for the same session and task share one computation, so
+    a retried request cannot generate and store a second design.
+
+    By default a design that takes longer than ``INLINE_DESIGN_BUDGET``
+    seconds is finished by a background job (``DesignPending``). Jobs pass
+    their own ``generate(utilities, byo_config, task_number, nso)``
+    coroutine function returning ``(concepts, algorithm)``. ``session``
+    overrides the stored session state, e.g. with utilities not written yet.
+    """
+    if generate is None:
+        generate = functools.partial(_generate_tournament, sid=sid, budget=config.INLINE_DESIGN_BUDGET)
+    return await tournament_flight.do(
+        (sid, task_number),
+        lambda: _get_or_create_tournament(db, sid, task_number, nso, session=session, generate=generate),
+    )
+
+@traced()
+async def _get_or_create_tournament(
+    db: AsyncSession,
+    sid: str,
+    task_number: int,
+    nso: int,
+    session: Dict[str, Any] = None,
+    generate=None,
+):
+    """Get or create tournament concepts.
+
+    ``session`` overrides the cached session state. ``generate`` overrides
+    how a missing design is generated.
+    """
+    cached = await design_cache.get((sid, task_number))
+    if cached is not None:
+        # Already stored, so a speculative design for it can never be served
+        speculator.cancel(sid, task_number, nso)
+        return cached
+    
+    if session is None:
+        session = await get_session_state(db, sid)
     
     if not session:
         raise ValueError(f"Session {sid} not found")
@@ -59,44 +466,301 @@ async def get_tournament(db: AsyncSession, sid: str, task_number: int, nso: int
         select(models.TournamentTask)
         .where(models.TournamentTask.session_id == sid)
         .where(models.TournamentTask.task_number == task_number)
+        .order_by(models.TournamentTask.id)
     )
     existing_tasks = existing_tasks.scalars().all()
     
     if existing_tasks:
         # Return existing concepts if task already exists (use the first one if multiple)
-        existing_task = existing_tasks[0]
-        
-        # Handle legacy data structure where concepts might be a single dict instead of list
-        concepts = existing_task.concepts
-        if isinstance(concepts, dict):
-            # Convert old single concept structure to new list structure
-            concepts = [{"id": 0, "attributes": concepts}]
-        elif isinstance(concepts, list):
-            # Ensure each concept has the proper structure
-            for i, concept in enumerate(concepts):
-                if isinstance(concept, dict) and "id" not in concept:
-                    # Convert concept without ID to proper structure
-                    concepts[i] = {"id": i, "attributes": concept}
-        
+        concepts = _normalize_concepts(existing_tasks[0].concepts)
+        await design_cache.set((sid, task_number), concepts)
+        speculator.cancel(sid, task_number, nso)
         return concepts
     
     # Generate new concepts if task doesn't exist
     # Ensure utilities is not None and byo_config exists
-    utilities = session.utilities or {}
-    byo_config = session.byo_config or {}
+    utilities = session["utilities"] or {}
+    byo_config = session["byo_config"] or {}
     
     if not byo_config:
         raise ValueError(f"No BYO configuration found for session {sid}")
     
-    concepts = utils.generate_tournament_set(utilities, byo_config, task_number, nso)
+    concepts = None
+    algorithm = "exchange"
+    if config.SPECULATIVE_PRECOMPUTE:
+        concepts = await speculator.claim(sid, task_number, nso)
+    if concepts is None:
+        concepts, algorithm = await (generate or _generate_tournament)(utilities, byo_config, task_number, nso)
     
     # Store the concepts array in the database
-    db.add(models.TournamentTask(session_id=sid, task_number=task_number, concepts=concepts))
-    await db.commit()
+    db.add(models.TournamentTask(session_id=sid, task_number=task_number, concepts=concepts, algorithm=algorithm))
+    with stage("commit"):
+        await db.commit()
+    # A concurrent request for all tasks may have stored this task first
+    concepts = await _first_stored_concepts(db, sid, task_number)
+    await design_cache.set((sid, task_number), concepts)
     
     return concepts
 
+async def _first_stored_concepts(db: AsyncSession, sid: str, task_number: int):
+    """Concepts of the first stored row of a tournament task, or None if it is not stored."""
+    result = await db.execute(
+        select(models.TournamentTask.concepts)
+        .where(models.TournamentTask.session_id == sid)
+        .where(models.TournamentTask.task_number == task_number)
+        .order_by(models.TournamentTask.id)
+        .limit(1)
+    )
+    stored = result.scalar()
+    return _normalize_concepts(stored) if stored is not None else None
+
+@traced()
+async def _generate_tournament(utilities, byo_config, task_number: int, nso: int, sid: str = None, budget: float = 0):
+    """Generate one tournament task with the algorithm the current load allows.
+
+    With a ``budget`` (seconds), a design still running after it is handed
+    to a background job and ``DesignPending`` is raised. While that job
+    runs, further calls for the same task raise ``DesignPending`` with the
+    same job instead of starting another design.
+
+    Returns:
+        ``(concepts, algorithm)``
+    """
+    if budget:
+        from .jobs import DesignPending, job_runner
+        job_id = job_runner.adopted(("tournament_task", sid, task_number))
+        if job_id is not None:
+            raise DesignPending(job_id)
+    
+    algorithm = design_policy.choose()
+    if algorithm in INLINE_ALGORITHMS:
+        return design_policy.generate(utilities, byo_config, task_number, nso, algorithm)
+    
+    await tournament_limiter.acquire()
+    design = submit_design(design_policy.generate, utilities, byo_config, task_number, nso, algorithm)
+    # The slot is held until the executor has finished (or dropped) the design,
+    # even if the request is cancelled or gives up on it first. The callback
+    # runs in the executor thread, so the release is handed to the event loop.
+    loop = asyncio.get_running_loop()
+    design.add_done_callback(lambda _: loop.call_soon_threadsafe(tournament_limiter.release))
+    future = asyncio.wrap_future(design)
+    if not budget:
+        return await future
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), budget)
+    except asyncio.TimeoutError:
+        job_id = await job_runner.adopt(
+            "tournament_task",
+            {"session_id": sid, "task_number": task_number, "n_options": nso},
+            _store_generated_task(sid, task_number, nso, future),
+            key=("tournament_task", sid, task_number),
+        )
+        raise DesignPending(job_id)
+
+async def _store_generated_task(sid: str, task_number: int, nso: int, future):
+    """Store a design finished after its request gave up on it; returns the stored task."""
+    concepts, algorithm = await future
+    async with AsyncSessionLocal() as db:
+        stored = await _first_stored_concepts(db, sid, task_number)
+        if stored is None:
+            db.add(models.TournamentTask(session_id=sid, task_number=task_number, concepts=concepts, algorithm=algorithm))
+            with stage("commit"):
+                await db.commit()
+            stored = await _first_stored_concepts(db, sid, task_number)
+        concepts = stored
+    await design_cache.set((sid, task_number), concepts)
+    speculator.cancel(sid, task_number, nso)
+    return {"task_number": task_number, "concepts": concepts}
+
+@traced()
+async def _generate_tournament_tasks(utilities, byo_config, task_numbers: List[int], nso: int):
+    """Generate several tournament tasks of one session with the algorithm the current load allows.
+
+    Returns:
+        ``{task_number: (concepts, algorithm)}``
+    """
+    algorithm = design_policy.choose()
+    if algorithm in INLINE_ALGORITHMS:
+        return design_policy.generate_many(utilities, byo_config, task_numbers, nso, algorithm)
+    async with prefetch_limiter.admit():
+        return await run_design(design_policy.generate_many, utilities, byo_config, task_numbers, nso, algorithm)
+
+@traced()
+async def get_all_tournament_tasks(db: AsyncSession, sid: str, nso: int = 3, generate=None):
+    """Get every planned tournament task of a session, generating missing ones in one batch.
+
+    Missing tasks are generated from the session's current utilities and
+    stored, so later single-task requests return the same concepts.
+    Concurrent calls for the same session share one computation.
+    ``generate(utilities, byo_config, task_numbers, nso)`` overrides how
+    they are generated and returns ``{task_number: (concepts, algorithm)}``.
+
+    Returns:
+        ``(total_tasks, [{"task_number", "concepts"}, ...])``
+    """
+    return await tournament_tasks_flight.do(
+        sid, lambda: _get_or_create_all_tournament_tasks(db, sid, nso, generate)
+    )
+
+@traced()
+async def _get_or_create_all_tournament_tasks(db: AsyncSession, sid: str, nso: int, generate=None):
+    """Get or create every planned tournament task of a session."""
+    state = await get_session_state(db, sid)
+    if not state:
+        raise ValueError(f"Session {sid} not found")
+    if not state["byo_config"]:
+        raise ValueError(f"No BYO configuration found for session {sid}")
+    if state["utilities"] is None:
+        raise ValueError("Screening responses must be submitted before the tournament")
+    
+    total_tasks = planned_tournament_tasks(state)
+    result = await db.execute(
+        select(models.TournamentTask.task_number, models.TournamentTask.concepts)
+        .where(models.TournamentTask.session_id == sid)
+        .where(models.TournamentTask.task_number <= total_tasks)
+        .order_by(models.TournamentTask.id)
+    )
+    tasks = {}
+    for task_number, concepts in result.all():
+        # Keep the first row if a task was stored more than once
+        tasks.setdefault(task_number, _normalize_concepts(concepts))
+    
+    missing = [n for n in range(1, total_tasks + 1) if n not in tasks]
+    if missing:
+        generated = await (generate or _generate_tournament_tasks)(state["utilities"], state["byo_config"], missing, nso)
+        await db.execute(
+            insert(models.TournamentTask),
+            [
+                {"session_id": sid, "task_number": n, "concepts": concepts, "algorithm": used}
+                for n, (concepts, used) in generated.items()
+            ],
+        )
+        with stage("commit"):
+            await db.commit()
+        # Re-read what was stored: a single-task request may have stored
+        # one of these tasks first, and its row is the one that is kept
+        result = await db.execute(
+            select(models.TournamentTask.task_number, models.TournamentTask.concepts)
+            .where(models.TournamentTask.session_id == sid)
+            .where(models.TournamentTask.task_number.in_(missing))
+            .order_by(models.TournamentTask.id)
+        )
+        for task_number, concepts in result.all():
+            tasks.setdefault(task_number, _normalize_concepts(concepts))
+        for n in missing:
+            await design_cache.set((sid, n), tasks[n])
+            speculator.cancel(sid, n, nso)
+    
+    return total_tasks, [{"task_number": n, "concepts": tasks[n]} for n in range(1, total_tasks + 1)]
+
+def planned_tournament_tasks(state: Dict[str, Any]) -> int:
+    """Number of tournament tasks planned for a session in its current state."""
+    filtered_byo = utils.filter_design_space_for_tournament(state["utilities"] or {}, state["byo_config"] or {})
+    return utils.calculate_optimal_tournament_tasks(filtered_byo)
+
+@traced()
 async def record_choice(db: AsyncSession, sid: str, task_number: int, choice_id: int):
+    state = await _apply_choice(db, sid, task_number, choice_id)
+    await _commit_session_state(db, sid, state)
+    if config.SPECULATIVE_PRECOMPUTE:
+        speculator.schedule(sid, task_number + 1, state["utilities"], state["byo_config"])
+    return task_number + 1
+
+@traced()
+async def record_choices(db: AsyncSession, sid: str, choices: List[schemas.ChoiceIn]):
+    """Record several choices in order and commit once.
+
+    Utility updates are applied in memory in the order given, exactly as if
+    each choice had been posted separately. Nothing is stored unless every
+    choice is valid.
+
+    Returns:
+        ``(next_task, utilities)`` after the last choice
+    """
+    if not choices:
+        raise ValueError("At least one choice is required")
+    session = await _session_state_for_update(db, sid)
+    if not session:
+        raise ValueError(f"Session {sid} not found")
+    
+    task_numbers = {choice.task_number for choice in choices}
+    result = await db.execute(
+        select(models.TournamentTask)
+        .where(models.TournamentTask.session_id == sid)
+        .where(models.TournamentTask.task_number.in_(task_numbers))
+        .order_by(models.TournamentTask.id)
+    )
+    tasks = {}
+    for task in result.scalars():
+        # Use the first one if a task was stored more than once
+        tasks.setdefault(task.task_number, task)
+    
+    utilities = session["utilities"] or {}
+    for choice in choices:
+        task = tasks.get(choice.task_number)
+        if task is None:
+            raise ValueError(f"Tournament task not found for session {sid}, task {choice.task_number}")
+        utilities = _choose(task, sid, choice.selected_concept_id, utilities)
+    
+    state = await _update_utilities(db, sid, session, utilities)
+    await _commit_session_state(db, sid, state)
+    next_task = choices[-1].task_number + 1
+    if config.SPECULATIVE_PRECOMPUTE:
+        speculator.schedule(sid, next_task, utilities, session["byo_config"])
+    return next_task, utilities
+
+@traced()
+async def record_choice_and_get_next(db: AsyncSession, sid: str, task_number: int, choice_id: int, nso: int = 3):
+    """Record a choice and return the next task.
+
+    The next task is designed from the updated utilities before anything is
+    written, so no write transaction is open while the design is generated
+    or waits for admission, and a shed or pending request records no
+    choice. The choice and utilities are then committed together.
+
+    Returns:
+        ``{"next_task", "complete", "task_number", "concepts"}``; once the
+        planned number of tasks is reached ``complete`` is True and no
+        concepts are generated.
+    """
+    task, session = await _load_choice_task(db, sid, task_number, for_update=False)
+    utilities = _as_stored(_choose(task, sid, choice_id, session["utilities"] or {}))
+    state = {"byo_config": session["byo_config"], "utilities": utilities}
+    next_task = task_number + 1
+    complete = next_task > planned_tournament_tasks(state)
+    concepts = None
+    if not complete:
+        # A session of its own, so the pending choice is not flushed with the new task
+        async with AsyncSessionLocal() as design_db:
+            concepts = await get_tournament(design_db, sid, next_task, nso, session=state)
+    # The utilities may have changed while the design was generated; apply the choice to the stored ones
+    current = await _session_state_for_update(db, sid)
+    if current is None:
+        raise ValueError(f"Session {sid} not found")
+    if current["utilities"] != session["utilities"]:
+        utilities = _choose(task, sid, choice_id, current["utilities"] or {})
+    state = await _update_utilities(db, sid, current, utilities)
+    await _commit_session_state(db, sid, state)
+    return {
+        "next_task": next_task,
+        "complete": complete,
+        "task_number": None if complete else next_task,
+        "concepts": concepts,
+    }
+
+async def _apply_choice(db: AsyncSession, sid: str, task_number: int, choice_id: int):
+    """Record a choice and update utilities without committing; returns the new session state."""
+    task, session = await _load_choice_task(db, sid, task_number)
+    utilities = _choose(task, sid, choice_id, session["utilities"] or {})
+    return await _update_utilities(db, sid, session, utilities)
+
+async def _load_choice_task(db: AsyncSession, sid: str, task_number: int, for_update: bool = True):
+    """The tournament task a choice is made on and the session state; returns ``(task, session)``.
+
+    With ``for_update`` the state is read from the database and its row
+    locked (see ``_session_state_for_update``); otherwise it may come from
+    the cache and must not be the base of a write.
+    """
     result = await db.execute(
         select(models.TournamentTask)
         .where(models.TournamentTask.session_id == sid)
@@ -113,6 +777,18 @@ async def record_choice(db: AsyncSession, sid: str, task_number: int, choice_id:
     else:
         task = tasks[0]
     
+    if for_update:
+        session = await _session_state_for_update(db, sid)
+    else:
+        session = await get_session_state(db, sid)
+    if not session:
+        raise ValueError(f"Session {sid} not found")
+    return task, session
+
+def _choose(task: models.TournamentTask, sid: str, choice_id: int, utilities: Dict[str, Any]):
+    """Record a choice on a tournament task and return the updated utilities."""
+    task_number = task.task_number
+    
     # Debug: Check the concepts structure
     if not task.concepts:
         raise ValueError(f"No concepts found in tournament task for session {sid}, task {task_number}")
@@ -132,9 +808,6 @@ async def record_choice(db: AsyncSession, sid: str, task_number: int, choice_id:
     # Record the choice (choice_id is the index into the concepts array)
     task.choice = choice_id
     
-    # Update utilities based on the chosen concept
-    session = await get_session(db, sid)
-    
     try:
         # Handle both old and new concept structures
         chosen_concept = task.concepts[choice_id]
@@ -143,9 +816,52 @@ async def record_choice(db: AsyncSession, sid: str, task_number: int, choice_id:
             chosen_concept = chosen_concept["attributes"]
         # Old structure: direct concept object
         
-        session.utilities = utils.adaptive_update(session.utilities or {}, chosen_concept)
+        return utils.adaptive_update(utilities, chosen_concept)
     except Exception as e:
         raise ValueError(f"Error processing concept {choice_id}: {str(e)}. Concepts structure: {task.concepts}")
+
+@traced()
+async def reestimate_utilities(db: AsyncSession, sid: str):
+    """Recompute a session's utilities from its stored screening responses and tournament choices.
+
+    The responses are replayed through the same updates the online flow
+    applies, so this repairs utilities that were lost or overwritten; it
+    is not a different estimator. The replay runs in the process pool.
+
+    Returns:
+        The new utilities
+    """
+    state = await get_session_state(db, sid)
+    if not state:
+        raise ValueError(f"Session {sid} not found")
+    
+    result = await db.execute(
+        select(models.ScreeningTask.concept, models.ScreeningTask.response)
+        .where(models.ScreeningTask.session_id == sid)
+        .order_by(models.ScreeningTask.position)
+    )
+    screening = result.all()
+    if not screening or any(response is None for _, response in screening):
+        raise ValueError("Screening responses must be submitted before utilities can be estimated")
     
-    await db.commit()
-    return task_number + 1
\ No newline at end of file
+    result = await db.execute(
+        select(models.TournamentTask.task_number, models.TournamentTask.concepts, models.TournamentTask.choice)
+        .where(models.TournamentTask.session_id == sid)
+        .where(models.TournamentTask.choice.isnot(None))
+        .order_by(models.TournamentTask.task_number, models.TournamentTask.id)
+    )
+    chosen = {}
+    for task_number, concepts, choice in result.all():
+        # Keep the first row if a task was stored more than once
+        if task_number not in chosen:
+            chosen[task_number] = _normalize_concepts(concepts)[choice]["attributes"]
+    
+    utilities = await run_in_process_pool(
+        utils.reestimate_utilities,
+        [response for _, response in screening],
+        [concept for concept, _ in screening],
+        [chosen[n] for n in sorted(chosen)],
+    )
+    state = await _update_utilities(db, sid, state, utilities)
+    await _commit_session_state(db, sid, state)
+    return utilities
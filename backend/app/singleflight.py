@@ -0,0 +1,87 @@
+"""
+Single-flight coalescing of identical in-flight coroutines.
+
+Survey front-ends often retry or double-fire the same request. A
+``SingleFlight`` group makes concurrent callers with the same key await the
+result of the first caller (the leader) instead of repeating its work.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .metrics import Counter, Gauge
+
+SINGLEFLIGHT_LEADERS = Counter(
+    "acbc_singleflight_leaders_total",
+    "Calls that ran the underlying computation.",
+    ("group",),
+)
+SINGLEFLIGHT_COALESCED = Counter(
+    "acbc_singleflight_coalesced_total",
+    "Calls that awaited an identical in-flight computation instead of running it.",
+    ("group",),
+)
+SINGLEFLIGHT_INFLIGHT = Gauge(
+    "acbc_singleflight_inflight",
+    "Computations currently in flight.",
+    ("group",),
+)
+
+
+class _LeaderCancelled(Exception):
+    """Raised to followers when the leader was cancelled before finishing."""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one computation."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` unless a call with the same key is already in flight.
+
+        Args:
+            key: Identity of the computation, e.g. ``(session_id, task_number)``
+            fn: Zero-argument coroutine factory performing the work
+
+        Returns:
+            The leader's result; followers receive the same object and
+            must not mutate it.
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            SINGLEFLIGHT_COALESCED.inc(group=self.name)
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # The leader's request went away; the next caller takes over.
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting; retrieve the exception so it is not logged.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        SINGLEFLIGHT_LEADERS.inc(group=self.name)
+        SINGLEFLIGHT_INFLIGHT.inc(group=self.name)
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+            SINGLEFLIGHT_INFLIGHT.dec(group=self.name)
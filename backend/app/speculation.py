@@ -0,0 +1,145 @@
+"""
+Speculative precomputation of the next tournament task.
+
+Once the choice for task N is committed, the utilities that task N+1 will
+be generated from are known. The ``Speculator`` starts building that design
+on the design executor right away, so the follow-up request only has to
+pick up the finished result. A job is dropped when its task is stored
+another way (a prefetch, a background job, another request), or once it
+has waited ``SPECULATIVE_TTL`` seconds.
+
+A job holds a slot of the tournament admission limiter while it runs and
+is only started when a slot is free, so speculation never queues ahead of
+(or sheds) real requests.
+"""
+
+import asyncio
+import concurrent.futures
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config, utils
+from .admission import tournament_limiter
+from .degradation import design_policy
+from .executor import submit_design
+from .metrics import Counter, Gauge
+
+SPECULATIVE_STARTED = Counter("acbc_speculative_started_total", "Speculative design jobs started.")
+SPECULATIVE_USED = Counter("acbc_speculative_used_total", "Speculative designs served to a request.")
+SPECULATIVE_SKIPPED = Counter(
+    "acbc_speculative_skipped_total",
+    "Speculative jobs not started because the outstanding-job cap was reached or no design slot was free.",
+)
+SPECULATIVE_WASTED = Counter(
+    "acbc_speculative_wasted_total",
+    "Speculative jobs whose result was never served.",
+    ("reason",),
+)
+SPECULATIVE_OUTSTANDING = Gauge(
+    "acbc_speculative_outstanding", "Speculative jobs pending, running or awaiting pickup."
+)
+
+_Key = Tuple[str, int, int]
+
+
+class Speculator:
+    """
+    Background builder for the next tournament task of each session.
+
+    Args:
+        max_outstanding: Cap on jobs pending, running or awaiting pickup;
+            further jobs are skipped rather than queued
+        ttl: Seconds a finished design waits for its request before it is
+            dropped as wasted
+    """
+
+    def __init__(self, max_outstanding: int, ttl: float):
+        self.max_outstanding = max_outstanding
+        self.ttl = ttl
+        self._jobs: Dict[_Key, Tuple[float, concurrent.futures.Future]] = {}
+        SPECULATIVE_OUTSTANDING.set_function(lambda: {(): len(self._jobs)})
+
+    def schedule(
+        self,
+        sid: str,
+        task_number: int,
+        utilities: Dict[str, Dict[str, float]],
+        byo_config: Dict[str, List[Any]],
+        n_options: int = 3,
+    ) -> bool:
+        """
+        Start building ``task_number`` for a session from committed utilities.
+
+        A job already scheduled for the same task is superseded, since it
+        was built from utilities that have since changed.
+
+        Returns:
+            True if a job was started
+        """
+        self._expire()
+        key = (sid, task_number, n_options)
+        self._discard(key, "superseded")
+
+        planned = utils.calculate_optimal_tournament_tasks(
+            utils.filter_design_space_for_tournament(utilities, byo_config)
+        )
+        if task_number > planned:
+            return False
+        # Extra work only adds to the backlog when designs are being degraded
+        if len(self._jobs) >= self.max_outstanding or design_policy.choose() != "exchange":
+            SPECULATIVE_SKIPPED.inc()
+            return False
+        if not tournament_limiter.try_acquire():
+            SPECULATIVE_SKIPPED.inc()
+            return False
+
+        future = submit_design(utils.generate_tournament_set, utilities, byo_config, task_number, n_options)
+        # The slot is held until the executor has finished (or dropped) the job;
+        # the callback may run in the executor thread
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(tournament_limiter.release))
+        self._jobs[key] = (time.monotonic() + self.ttl, future)
+        SPECULATIVE_STARTED.inc()
+        return True
+
+    async def claim(self, sid: str, task_number: int, n_options: int = 3) -> Optional[List[Dict[str, Any]]]:
+        """
+        Take the speculative design for a task, waiting for it if still running.
+
+        Returns:
+            The concepts, or None if no usable job exists
+        """
+        self._expire()
+        entry = self._jobs.pop((sid, task_number, n_options), None)
+        if entry is None:
+            return None
+        future = entry[1]
+        try:
+            concepts = await asyncio.wrap_future(future)
+        except (Exception, asyncio.CancelledError):
+            SPECULATIVE_WASTED.inc(reason="failed")
+            return None
+        SPECULATIVE_USED.inc()
+        return concepts
+
+    def cancel(self, sid: str, task_number: int, n_options: int = 3) -> None:
+        """Drop the job for a task because the task was stored without claiming it."""
+        self._discard((sid, task_number, n_options), "cancelled")
+
+    def _discard(self, key: _Key, reason: str) -> None:
+        entry = self._jobs.pop(key, None)
+        if entry is not None:
+            entry[1].cancel()
+            SPECULATIVE_WASTED.inc(reason=reason)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._jobs.items() if expires_at < now]:
+            self._discard(key, "expired")
+
+    def shutdown(self) -> None:
+        for key in list(self._jobs):
+            self._discard(key, "cancelled")
+
+
+speculator = Speculator(config.SPECULATIVE_MAX_OUTSTANDING, config.SPECULATIVE_TTL)
@@ -0,0 +1,243 @@
+"""
+Application startup and shutdown.
+
+Startup runs in phases, each timed and exported as
+``acbc_startup_phase_seconds``:
+
+1. ``schema``: compare the database's Alembic revision with the migration
+   head instead of running ``create_all`` on every worker. An empty database
+   (local development) gets its tables created and stamped at the head when
+   ``AUTO_CREATE_SCHEMA`` is on; tables without a revision stop startup.
+2. ``pool``: open ``POOL_WARM_CONNECTIONS`` connections up front, so the
+   first requests do not pay for connection setup.
+3. ``warmup``: generate a screening and a tournament design for the most
+   common study configurations on the design executor, so its threads and
+   the NumPy code paths are ready before the first respondent arrives.
+
+Once serving, the background job runner (``jobs.py``) claims queued jobs.
+"""
+
+import asyncio
+import logging
+import signal
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, text
+
+from . import config, models, utils
+from .database import AsyncSessionLocal, Base, engine
+from .degradation import loop_lag
+from .executor import run_design, shutdown_design_executor
+from .health import readiness
+from .jobs import job_runner
+from .metrics import Gauge
+from .serialization import dumps
+from .speculation import speculator
+from .tracing import tracer
+
+# Shown next to uvicorn's own startup messages
+logger = logging.getLogger("uvicorn.error")
+
+_phase_seconds = Gauge("acbc_startup_phase_seconds", "Duration of each startup phase.", ("phase",))
+
+_ALEMBIC_DIR = Path(__file__).resolve().parent.parent / "alembic"
+
+# Used when the database has no sessions yet
+_DEFAULT_WARMUP_CONFIG = {
+    "brand": ["Apple", "Samsung", "Google"],
+    "storage": ["64GB", "128GB", "256GB"],
+    "price": ["$499", "$699", "$899"],
+}
+
+# How many stored sessions to sample when looking for common configurations
+_WARMUP_SAMPLE = 500
+
+
+def _script_directory():
+    # Alembic is only needed here, so it is not imported with the app
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    alembic_config = Config()
+    alembic_config.set_main_option("script_location", str(_ALEMBIC_DIR))
+    return ScriptDirectory.from_config(alembic_config)
+
+
+def _current_revision(connection) -> Optional[str]:
+    from alembic.runtime.migration import MigrationContext
+
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def _app_tables(connection) -> List[str]:
+    from sqlalchemy import inspect
+
+    existing = set(inspect(connection).get_table_names())
+    return sorted(name for name in Base.metadata.tables if name in existing)
+
+
+def _create_and_stamp(connection, script, head: str) -> None:
+    from alembic.runtime.migration import MigrationContext
+
+    Base.metadata.create_all(connection)
+    MigrationContext.configure(connection).stamp(script, head)
+
+
+async def check_schema() -> None:
+    """Check that the database is at the Alembic head revision.
+
+    Raises:
+        RuntimeError: The database has tables but no Alembic revision, so
+            its schema is unknown (``create_all`` would not add new columns),
+            or it is behind the head and ``REQUIRE_SCHEMA_HEAD`` is on
+    """
+    script = _script_directory()
+    head = script.get_current_head()
+    async with engine.begin() as conn:
+        current = await conn.run_sync(_current_revision)
+        if current == head:
+            return
+        if current is None:
+            tables = await conn.run_sync(_app_tables)
+            if tables:
+                base = script.get_base()
+                raise RuntimeError(
+                    f"Database has tables ({', '.join(tables)}) but no Alembic revision. If they were created "
+                    f"before migrations were used, run 'alembic stamp {base}' and then 'alembic upgrade head'"
+                )
+            if config.AUTO_CREATE_SCHEMA:
+                await conn.run_sync(_create_and_stamp, script, head)
+                logger.info("Created the schema in an empty database and stamped it at %s", head)
+                return
+
+    message = f"Database schema is at revision {current}, expected {head}; run 'alembic upgrade head'"
+    if config.REQUIRE_SCHEMA_HEAD:
+        raise RuntimeError(message)
+    logger.warning(message)
+
+
+async def warm_pool(connections: int) -> None:
+    """Open ``connections`` pooled connections at once, then return them to the pool."""
+    if connections <= 0:
+        return
+    opened = await asyncio.gather(*(engine.connect().start() for _ in range(connections)))
+    try:
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in opened))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in opened))
+
+
+async def _common_configs(limit: int) -> List[Dict[str, List[Any]]]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(models.Session.byo_config).limit(_WARMUP_SAMPLE))
+        configs = [byo for byo in result.scalars().all() if byo]
+    tally = Counter(dumps(byo) for byo in configs)
+    by_key = {dumps(byo): byo for byo in configs}
+    return [by_key[key] for key, _ in tally.most_common(limit)]
+
+
+def _generate_designs(byo: Dict[str, List[Any]]) -> None:
+    tasks = utils.generate_screening_matrix(byo)
+    responses = [i % 2 == 0 for i in range(len(tasks))]
+    utilities = utils.estimate_initial_utilities(responses, tasks)
+    utils.generate_tournament_set(utilities, byo, 1)
+
+
+async def warm_designs(limit: int) -> int:
+    """
+    Generate designs for the most common stored study configurations.
+
+    Args:
+        limit: Number of configurations to warm up
+
+    Returns:
+        Number of configurations used
+    """
+    configs = await _common_configs(limit) or [_DEFAULT_WARMUP_CONFIG]
+    await asyncio.gather(*(run_design(_generate_designs, byo) for byo in configs))
+    return len(configs)
+
+
+@asynccontextmanager
+async def _phase(timings: Dict[str, float], name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - started
+        _phase_seconds.set(timings[name], phase=name)
+
+
+def _drain_on_sigterm() -> None:
+    """Report the worker as draining as soon as SIGTERM arrives, then let the server shut down as usual."""
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+    except ValueError:
+        return
+    # Without a server handler SIGTERM kills the process at once; there is nothing to drain
+    if not callable(previous):
+        return
+
+    def handler(signum, frame):
+        readiness.draining = True
+        previous(signum, frame)
+
+    try:
+        signal.signal(signal.SIGTERM, handler)
+    except ValueError:
+        # Not in the main thread (e.g. a test client); shutdown still sets draining below
+        pass
+
+
+def lifespan(import_started: float):
+    """
+    Build the FastAPI lifespan handler.
+
+    Args:
+        import_started: ``time.perf_counter()`` taken before the app modules
+            were imported, reported as the ``import`` phase
+    """
+
+    @asynccontextmanager
+    async def handler(app):
+        timings = {"import": time.perf_counter() - import_started}
+        _phase_seconds.set(timings["import"], phase="import")
+        started = time.perf_counter()
+
+        async with _phase(timings, "schema"):
+            await check_schema()
+        async with _phase(timings, "pool"):
+            await warm_pool(config.POOL_WARM_CONNECTIONS)
+        if config.STARTUP_WARMUP:
+            async with _phase(timings, "warmup"):
+                try:
+                    await warm_designs(config.WARMUP_CONFIGS)
+                except Exception as e:
+                    # A failed warm-up only costs the first request some latency
+                    logger.warning("Design warm-up failed: %s", e)
+
+        logger.info(
+            "Startup finished in %.2fs (%s)",
+            time.perf_counter() - started + timings["import"],
+            ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()),
+        )
+        loop_lag.start()
+        job_runner.start()
+        # uvicorn and gunicorn workers stop accepting and finish open requests
+        # on SIGTERM before the lifespan shutdown below runs
+        _drain_on_sigterm()
+        yield
+
+        readiness.draining = True
+        await job_runner.stop()
+        loop_lag.stop()
+        speculator.shutdown()
+        shutdown_design_executor()
+        tracer.exporter.shutdown()
+        await engine.dispose()
+
+    return handler
@@ -0,0 +1,319 @@
+"""
+Request tracing.
+
+A trace is a tree of timed spans: one per HTTP request
+(``TracingMiddleware``), with children for query-string repair, the router
+handler (``routers.TracedRoute``), service and ``utils`` functions (``@traced``)
+and every SQL statement. Spans carry attributes such as the candidate-space
+size or the number of exchange iterations, so a slow request shows whether
+the time went into the database or the design search.
+
+Whether a request is traced is decided once, when its root span starts,
+with probability ``TRACE_SAMPLE_RATE`` (0 disables tracing); spans outside
+a request are not recorded. Spans of unsampled requests are a shared no-op object, so untraced requests pay
+little more than a context-variable lookup per span. Work submitted to the
+design executor inherits the trace; work on the process pool does not.
+
+Finished spans are handed to the exporter chosen by ``TRACE_EXPORTER``:
+
+- ``memory``: the last ``TRACE_MEMORY_SPANS`` spans, kept in this process
+- ``file``: one JSON object per line appended to ``TRACE_FILE``
+- ``none``: spans are dropped
+"""
+
+import collections
+import contextvars
+import functools
+import inspect
+import random
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import config
+from .request_metrics import route_name
+from .serialization import dumps
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attributes", "error", "_started", "_token")
+
+    sampled = True
+
+    def __init__(self, name: str, trace_id: int, parent_id: Optional[int], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _ids.getrandbits(64)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """End the span and export it."""
+        self.duration = time.perf_counter() - self._started
+        if error is not None and self.error is None:
+            self.error = type(error).__name__
+        tracer.exporter.export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current.reset(self._token)
+        self.finish(exc)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": f"{self.trace_id:032x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id is not None else None,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for every span of an unsampled request."""
+
+    __slots__ = ()
+
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+AnySpan = Union[Span, _NoopSpan]
+
+# Separate from the module-level RNG, which design generation seeds and uses
+_ids = random.Random()
+_current: contextvars.ContextVar[Optional[AnySpan]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class SpanExporter:
+    """Receives every finished span of sampled traces; may be called from executor threads."""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class NoopExporter(SpanExporter):
+    def export(self, span: Span) -> None:
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent spans, e.g. for inspecting traces from a shell or benchmark."""
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans: Deque[Span] = collections.deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Finished spans, oldest first, optionally of one trace (hex ID as in ``X-Trace-Id``)."""
+        spans = [span.to_dict() for span in list(self._spans)]
+        if trace_id is not None:
+            spans = [span for span in spans if span["trace_id"] == trace_id]
+        return spans
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+class FileExporter(SpanExporter):
+    """Appends each span as a JSON line to ``path``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = dumps(span.to_dict()) + b"\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(line)
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def create_exporter(kind: str) -> SpanExporter:
+    """Build the span exporter named by ``kind`` (see module docstring)."""
+    if kind == "memory":
+        return InMemoryExporter(config.TRACE_MEMORY_SPANS)
+    if kind == "file":
+        return FileExporter(config.TRACE_FILE)
+    if kind == "none":
+        return NoopExporter()
+    raise ValueError(f"Unknown TRACE_EXPORTER '{kind}'")
+
+
+class Tracer:
+    """
+    Starts spans and samples traces.
+
+    Args:
+        sample_rate: Share of requests traced (0 to 1)
+        exporter: Receives finished spans
+    """
+
+    def __init__(self, sample_rate: float, exporter: SpanExporter):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    def start_trace(self, name: str, **attributes: Any) -> AnySpan:
+        """Root span of a new trace, if it is sampled."""
+        if not self.sample_rate or _ids.random() >= self.sample_rate:
+            return NOOP_SPAN
+        return Span(name, _ids.getrandbits(128), None, attributes)
+
+    def start_span(self, name: str, **attributes: Any) -> AnySpan:
+        """Span under the current one; outside a sampled trace nothing is recorded."""
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return NOOP_SPAN
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+
+
+tracer = Tracer(config.TRACE_SAMPLE_RATE, create_exporter(config.TRACE_EXPORTER))
+
+
+def span(name: str, **attributes: Any) -> AnySpan:
+    """Context manager timing a block as a child of the current span (see ``Tracer.start_span``)."""
+    return tracer.start_span(name, **attributes)
+
+
+def current_span() -> AnySpan:
+    """The innermost open span, for adding attributes; a no-op span outside sampled traces."""
+    return _current.get() or NOOP_SPAN
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator running each call of a function (sync or async) in a span named after it."""
+
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                parent = _current.get()
+                if parent is None or not parent.sampled:
+                    return await fn(*args, **kwargs)
+                with tracer.start_span(span_name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            parent = _current.get()
+            if parent is None or not parent.sampled:
+                return fn(*args, **kwargs)
+            with tracer.start_span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def instrument_engine(sync_engine) -> None:
+    """Record every SQL statement run on ``sync_engine`` as a ``db.query`` span."""
+    # Imported here so utils (and the process pool) can use tracing without SQLAlchemy
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return
+        attributes = {"db.statement": " ".join(statement.split())[:300]}
+        if executemany:
+            attributes["db.rows"] = len(parameters)
+        conn.info.setdefault("trace_spans", []).append(Span("db.query", parent.trace_id, parent.span_id, attributes))
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().finish()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(context):
+        spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+        if spans:
+            spans.pop().finish(context.original_exception)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting the root span of each sampled request.
+
+    Added last (outermost), so query-string repair and compression are
+    inside the trace. Sampled responses carry an ``X-Trace-Id`` header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not tracer.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        root = tracer.start_trace(scope["method"], **{"http.method": scope["method"], "http.path": scope["path"]})
+        if not root.sampled:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_trace(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                MutableHeaders(scope=message)["X-Trace-Id"] = f"{root.trace_id:032x}"
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_with_trace)
+            # Repaired URLs are routed on a copy of the scope; their route is not known here
+            route = route_name(scope)
+            root.name = f"{scope['method']} {route}"
+            root.set_attribute("http.route", route)
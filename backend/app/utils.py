@@ -1,7 +1,10 @@
 from itertools import product
+import math
 import random
 import numpy as np
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
+from .metrics import stage
+from .tracing import current_span, traced
 
 # Generate full factorial design
 def full_factorial(attributes: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
@@ -21,6 +24,7 @@ def generate_byo_profile(byo: Dict[str, List[Any]]) -> Dict[str, Any]:
         byo_profile[attribute] = random.choice(levels)
     return byo_profile
 
+@traced()
 def generate_screening_matrix(byo: Dict[str, List[Any]], n_tasks: int = 10) -> List[Dict[str, Any]]:
     """
     Generate screening concepts by perturbing the BYO profile.
@@ -57,8 +61,12 @@ def generate_screening_matrix(byo: Dict[str, List[Any]], n_tasks: int = 10) -> L
     
     # Generate remaining concepts by perturbing BYO profile
     concept_count = 1  # We already added BYO profile
-    
-    while concept_count < n_tasks:
+
+    # Small designs have fewer distinct 1-2 attribute perturbations than
+    # n_tasks; stop drawing once new ones have clearly run out
+    attempts = 0
+    while concept_count < n_tasks and attempts < 50 * n_tasks:
+        attempts += 1
         # Create a new concept based on BYO profile
         new_concept = byo_profile.copy()
         
@@ -109,6 +117,21 @@ def generate_screening_matrix(byo: Dict[str, List[Any]], n_tasks: int = 10) -> L
     
     return concepts
 
+def generate_screening_matrices(byos: List[Dict[str, List[Any]]], n_tasks: int = 10) -> List[List[Dict[str, Any]]]:
+    """
+    Generate screening concepts for several BYO configurations.
+
+    Module-level so it can be sent to a process pool for bulk session creation.
+
+    Args:
+        byos: List of BYO configurations
+        n_tasks: Number of screening concepts per configuration
+
+    Returns:
+        One list of screening concepts per configuration
+    """
+    return [generate_screening_matrix(byo, n_tasks) for byo in byos]
+
 def create_design_matrix(profiles: List[Dict[str, Any]]) -> Tuple[np.ndarray, List[str]]:
     """
     Create a design matrix from profiles using effects coding.
@@ -182,7 +205,8 @@ def calculate_d_optimality(X: np.ndarray) -> float:
     except np.linalg.LinAlgError:
         return 0.0
 
-def generate_choice_sets(profiles: List[Dict[str, Any]], n_options: int = 2, n_sets: int = 5) -> List[List[Dict[str, Any]]]:
+@traced()
+def generate_choice_sets(profiles: List[Dict[str, Any]], n_options: int = 2, n_sets: int = 5, max_iterations: int = 50, max_candidates: Optional[int] = None) -> List[List[Dict[str, Any]]]:
     """
     Generate D-optimal choice sets using coordinate exchange algorithm.
     
@@ -190,6 +214,9 @@ def generate_choice_sets(profiles: List[Dict[str, Any]], n_options: int = 2, n_s
         profiles: List of all possible profiles
         n_options: Number of options per choice set (2 or 3)
         n_sets: Number of choice sets to generate
+        max_iterations: Maximum number of improving exchanges
+        max_candidates: If set, only a random sample of this many profiles
+            is tried as replacements
     
     Returns:
         List of choice sets, each containing n_options profiles
@@ -214,8 +241,16 @@ def generate_choice_sets(profiles: List[Dict[str, Any]], n_options: int = 2, n_s
             choice_set = profiles.copy()
         choice_sets.append(choice_set)
     
+    candidates = profiles
+    if max_candidates is not None and len(profiles) > max_candidates:
+        candidates = random.sample(profiles, max_candidates)
+    span = current_span()
+    span.set_attribute("design.profiles", len(profiles))
+    span.set_attribute("design.candidates", len(candidates))
+    
     # Coordinate exchange algorithm for D-optimality
-    max_iterations = 50
+    evaluations = 0
+    iteration = -1
     for iteration in range(max_iterations):
         improved = False
         
@@ -227,7 +262,7 @@ def generate_choice_sets(profiles: List[Dict[str, Any]], n_options: int = 2, n_s
                 current_profile = current_set[profile_idx]
                 
                 # Try all other profiles as replacement
-                for candidate_profile in profiles:
+                for candidate_profile in candidates:
                     if candidate_profile in current_set:
                         continue
                     
@@ -245,6 +280,7 @@ def generate_choice_sets(profiles: List[Dict[str, Any]], n_options: int = 2, n_s
                         all_profiles.extend(cs)
                     
                     X_combined, _ = create_design_matrix(all_profiles)
+                    evaluations += 1
                     
                     if X_combined.size > 0:
                         new_d_opt = calculate_d_optimality(X_combined)
@@ -270,6 +306,8 @@ def generate_choice_sets(profiles: List[Dict[str, Any]], n_options: int = 2, n_s
         if not improved:
             break
     
+    span.set_attribute("design.iterations", iteration + 1)
+    span.set_attribute("design.evaluations", evaluations)
     return choice_sets
 
 def calculate_optimal_tournament_tasks(filtered_byo: Dict[str, List[Any]], min_tasks_per_parameter: float = 2.0) -> int:
@@ -345,8 +383,43 @@ def generate_tournament_plan(previous_utilities: Dict[str, Dict[str, float]], by
         "design_matrix_shape": design_matrix.shape if design_matrix.size > 0 else (0, 0)
     }
 
+# Tournament design algorithms, from best to cheapest. "exchange" runs the
+# full coordinate exchange, "limited" stops it after a few improvements over
+# a sample of candidate profiles and "random_balanced" deals out levels
+# evenly without any optimisation.
+TOURNAMENT_ALGORITHMS = ("exchange", "limited", "random_balanced")
+# (max_iterations, max_candidates) of the coordinate exchange
+EXCHANGE_SETTINGS = {"exchange": (50, None), "limited": (5, 48)}
+
+def generate_balanced_random_set(attributes: Dict[str, List[Any]], n_options: int, attempts: int = 10) -> List[Dict[str, Any]]:
+    """
+    Generate level-balanced random concepts.
+    
+    Each attribute's levels are dealt out as evenly as possible across the
+    concepts in random order, so no level appears twice before every level
+    has appeared once.
+    
+    Args:
+        attributes: Design space (attribute -> levels)
+        n_options: Number of concepts
+        attempts: Reshuffles tried to avoid duplicate concepts
+    
+    Returns:
+        List of n_options concepts
+    """
+    for _ in range(attempts):
+        columns = {}
+        for attr, levels in attributes.items():
+            dealt = random.sample(levels, len(levels)) * (n_options // len(levels) + 1)
+            columns[attr] = random.sample(dealt[:n_options], n_options)
+        concepts = [{attr: columns[attr][i] for attr in attributes} for i in range(n_options)]
+        if len({tuple(c.values()) for c in concepts}) == n_options:
+            break
+    return concepts
+
 # Tournament: D-optimal design using filtered design space
-def generate_tournament_set(previous_utilities: Dict[str, Dict[str, float]], byo: Dict[str, List[Any]], task_number: int, n_options: int = 3) -> List[Dict[str, Any]]:
+@traced()
+def generate_tournament_set(previous_utilities: Dict[str, Dict[str, float]], byo: Dict[str, List[Any]], task_number: int, n_options: int = 3, algorithm: str = "exchange") -> List[Dict[str, Any]]:
     """
     Generate tournament concepts using D-optimal design with filtered design space.
     
@@ -355,36 +428,56 @@ def generate_tournament_set(previous_utilities: Dict[str, Dict[str, float]], byo
         byo: Original BYO configuration with all attributes and levels
         task_number: Current tournament task number
         n_options: Number of concepts to generate (default: 3 for choice sets)
+        algorithm: One of TOURNAMENT_ALGORITHMS (default: full exchange)
     
     Returns:
         List of tournament concepts with IDs
     """
     # Filter design space based on screening utilities
-    filtered_byo = filter_design_space_for_tournament(previous_utilities, byo)
-    
-    # Generate all possible profiles from filtered design space
-    all_profiles = full_factorial(filtered_byo)
+    with stage("filtering"):
+        design_space = filter_design_space_for_tournament(previous_utilities, byo)
+    n_profiles = math.prod(len(levels) for levels in design_space.values())
     
     # If we don't have enough profiles, fall back to original BYO
-    if len(all_profiles) < n_options:
-        all_profiles = full_factorial(byo)
+    if n_profiles < n_options:
+        design_space = byo
+        n_profiles = math.prod(len(levels) for levels in design_space.values())
+    
+    span = current_span()
+    span.set_attribute("design.algorithm", algorithm)
+    span.set_attribute("design.space_size", n_profiles)
     
     # Determine actual number of options based on available profiles
-    actual_n_options = min(n_options, len(all_profiles))
+    actual_n_options = min(n_options, n_profiles)
     
     # Use 4 options as fallback only if we have significantly more profiles
-    if actual_n_options == 3 and len(all_profiles) >= 8:
+    if actual_n_options == 3 and n_profiles >= 8:
         # Try to use 4 options if we have 8+ profiles available
         actual_n_options = 4
     
-    # Generate D-optimal choice sets
-    choice_sets = generate_choice_sets(all_profiles, n_options=actual_n_options, n_sets=1)
-    
-    if not choice_sets:
-        # Fallback to random selection
-        sampled_concepts = random.sample(all_profiles, min(actual_n_options, len(all_profiles)))
+    if algorithm == "random_balanced" and actual_n_options > 0:
+        sampled_concepts = generate_balanced_random_set(design_space, actual_n_options)
     else:
-        sampled_concepts = choice_sets[0]
+        # Generate all possible profiles from the design space
+        with stage("candidate_enumeration"):
+            all_profiles = full_factorial(design_space)
+        
+        # Generate D-optimal choice sets
+        max_iterations, max_candidates = EXCHANGE_SETTINGS.get(algorithm, EXCHANGE_SETTINGS["exchange"])
+        with stage("d_optimal_search"):
+            choice_sets = generate_choice_sets(
+                all_profiles,
+                n_options=actual_n_options,
+                n_sets=1,
+                max_iterations=max_iterations,
+                max_candidates=max_candidates,
+            )
+        
+        if not choice_sets:
+            # Fallback to random selection
+            sampled_concepts = random.sample(all_profiles, min(actual_n_options, len(all_profiles)))
+        else:
+            sampled_concepts = choice_sets[0]
     
     # Add concept IDs to each concept
     concepts_with_ids = []
@@ -398,6 +491,7 @@ def generate_tournament_set(previous_utilities: Dict[str, Dict[str, float]], byo
     return concepts_with_ids
 
 # Estimate utilities based on screening responses
+@traced()
 def estimate_initial_utilities(responses: List[bool], tasks: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
     """
     Estimate utilities based on screening responses using the algorithm from Screening_Concepts_algo.md.
@@ -458,6 +552,7 @@ def estimate_initial_utilities(responses: List[bool], tasks: List[Dict[str, Any]
     
     return utilities
 
+@traced()
 def filter_design_space_for_tournament(utilities: Dict[str, Dict[str, float]], byo: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
     """
     Filter the design space for the tournament based on screening utilities.
@@ -491,6 +586,7 @@ def filter_design_space_for_tournament(utilities: Dict[str, Dict[str, float]], b
     return filtered_byo
 
 # Update utilities based on choice
+@traced()
 def adaptive_update(current_utils: Dict[str, Dict[str, float]], choice: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
     """
     Update utilities based on the chosen concept in tournament.
@@ -522,4 +618,24 @@ def adaptive_update(current_utils: Dict[str, Dict[str, float]], choice: Dict[str
                 if other_level != level:
                     updated_utils[attr][other_level] = max(0.0, updated_utils[attr][other_level] - 0.05)
     
-    return updated_utils
\ No newline at end of file
+    return updated_utils
+
+
+# Re-estimate utilities from a complete response history
+@traced()
+def reestimate_utilities(responses: List[bool], screening_concepts: List[Dict[str, Any]], chosen_concepts: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Recompute utilities from scratch, as the online flow builds them.
+    
+    Args:
+        responses: Screening responses in position order
+        screening_concepts: Screening concepts in position order
+        chosen_concepts: Attributes of the chosen tournament concept, in task order
+    
+    Returns:
+        Dictionary of attribute-level utilities
+    """
+    utilities = estimate_initial_utilities(responses, screening_concepts)
+    for chosen in chosen_concepts:
+        utilities = adaptive_update(utilities, chosen)
+    return utilities
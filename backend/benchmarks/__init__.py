@@ -0,0 +1,12 @@
+"""
+Benchmarks for the ACBC backend.
+
+Run the modules from the repository root, e.g.::
+
+    python -m backend.benchmarks.bench_serialization
+    python -m backend.benchmarks.bench_compression
+    python -m backend.benchmarks.bench_recovery
+    python -m backend.benchmarks.bench_utils run --compare
+    python -m backend.benchmarks.loadtest --respondents 1000 --concurrency 100
+    python -m backend.benchmarks.query_budget
+"""
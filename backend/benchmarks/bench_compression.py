@@ -0,0 +1,68 @@
+"""
+Response compression benchmark.
+
+Measures bytes on the wire and CPU time per response for the full and
+compact design formats, uncompressed and with gzip and brotli (when the
+``brotli`` package is installed), at the levels configured for the API.
+
+Usage::
+
+    python -m backend.benchmarks.bench_compression [--number N]
+"""
+
+import argparse
+import timeit
+import zlib
+
+from backend.app.compression import _Compressor, brotli, compact_screening, compact_tournament, compact_tournament_tasks
+from backend.app.config import BROTLI_QUALITY, GZIP_LEVEL
+from backend.app.serialization import dumps
+from backend.benchmarks.fixtures import prefetch_payload, screening_payload, tournament_payload
+
+_tournament = tournament_payload()
+_prefetch = prefetch_payload()
+
+CASES = [
+    ("tournament task", _tournament, compact_tournament(_tournament["task_number"], _tournament["concepts"])),
+    ("screening design", screening_payload(), compact_screening(screening_payload())),
+    (
+        "tournament prefetch",
+        _prefetch,
+        compact_tournament_tasks(_prefetch["session_id"], _prefetch["total_tasks"], _prefetch["tasks"]),
+    ),
+]
+
+ENCODINGS = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+
+def encode(payload, encoding: str) -> bytes:
+    body = dumps(payload)
+    if encoding == "identity":
+        return body
+    return _Compressor(encoding, GZIP_LEVEL, BROTLI_QUALITY).compress(body, final=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=1000, help="iterations per case")
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli not installed; skipping br\n")
+    print(f"{'payload':20} {'format':8} {'encoding':9} {'bytes':>7} {'ratio':>6} {'us':>8}")
+    for name, full, compact in CASES:
+        baseline = len(encode(full, "identity"))
+        for fmt, payload in (("full", full), ("compact", compact)):
+            for encoding in ENCODINGS:
+                body = encode(payload, encoding)
+                if encoding == "gzip":
+                    assert zlib.decompress(body, 31) == dumps(payload)
+                seconds = min(timeit.repeat(lambda: encode(payload, encoding), number=args.number, repeat=3))
+                print(
+                    f"{name:20} {fmt:8} {encoding:9} {len(body):7d} {len(body) / baseline:6.2f} "
+                    f"{seconds / args.number * 1e6:8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
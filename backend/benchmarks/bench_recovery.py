@@ -0,0 +1,88 @@
+"""
+Speed and parameter-recovery benchmark for the design and estimation algorithms.
+
+Every tournament design algorithm in ``utils.TOURNAMENT_ALGORITHMS`` is
+run on the same simulated respondents, who answer through logit draws from
+known utilities (see ``simulation.py``). Utilities are estimated as the API
+does, updated after each choice; re-estimating from the full history
+(``utils.reestimate_utilities``) replays the same updates, so it would give
+identical results and is not compared. Reports design and estimation wall
+time and how well the true utilities are recovered, so a faster algorithm
+can be checked for lost statistical quality.
+
+Usage::
+
+    python -m backend.benchmarks.bench_recovery [--respondents N] [--study small|smartphone]
+        [--tasks T] [--seed S] [--output report.json]
+"""
+
+import argparse
+import json
+import random
+from typing import Any, Dict, List
+
+import numpy as np
+
+from backend.app import utils
+from backend.benchmarks.loadtest import STUDIES
+from backend.benchmarks.simulation import SimulatedRespondent, recovery, simulate_survey
+
+
+def run_case(study: Dict[str, List[Any]], algorithm: str, respondents: int, tasks, seed: int) -> Dict[str, Any]:
+    """Simulate ``respondents`` surveys with one design algorithm; returns mean timings and recovery."""
+    results = []
+    for i in range(respondents):
+        # Same respondents and the same design randomness for every case
+        random.seed(seed + i)
+        respondent = SimulatedRespondent(study, np.random.default_rng(seed + i))
+        survey = simulate_survey(respondent, study, algorithm, n_tasks=tasks)
+        results.append(dict(survey, **recovery(respondent, survey["utilities"], study)))
+
+    def mean(key: str) -> float:
+        return float(np.mean([r[key] for r in results]))
+
+    return {
+        "algorithm": algorithm,
+        "tasks": mean("tasks"),
+        "design_ms_per_respondent": round(mean("design_seconds") * 1000, 3),
+        "estimation_ms_per_respondent": round(mean("estimation_seconds") * 1000, 3),
+        "correlation": round(mean("correlation"), 4),
+        "rmse": round(mean("rmse"), 4),
+        "hit_rate": round(mean("hit_rate"), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--respondents", type=int, default=50, help="simulated respondents per case")
+    parser.add_argument("--study", choices=sorted(STUDIES), default="small", help="BYO configuration used")
+    parser.add_argument("--tasks", type=int, help="tournament tasks per respondent (default: as planned by the API)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for respondents and designs")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    study = STUDIES[args.study]
+    cases = [
+        run_case(study, algorithm, args.respondents, args.tasks, args.seed)
+        for algorithm in utils.TOURNAMENT_ALGORITHMS
+    ]
+
+    print(f"{args.respondents} simulated respondents, {args.study} study\n")
+    print(f"{'algorithm':16} {'tasks':>5} {'design ms':>10} {'estim. ms':>10} {'corr':>6} {'rmse':>6} {'hits':>6}")
+    for case in cases:
+        print(
+            f"{case['algorithm']:16} {case['tasks']:5.1f} "
+            f"{case['design_ms_per_respondent']:10.1f} {case['estimation_ms_per_respondent']:10.3f} "
+            f"{case['correlation']:6.3f} {case['rmse']:6.3f} {case['hit_rate']:6.3f}"
+        )
+
+    if args.output:
+        report = {"respondents": args.respondents, "study": args.study, "seed": args.seed, "cases": cases}
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Response serialization benchmark.
+
+Compares FastAPI's default path (validate and dump with the response model,
+then stdlib ``json``) with the trusted orjson path the
+routers use for data read from the database.
+
+Usage::
+
+    python -m backend.benchmarks.bench_serialization [--number N]
+"""
+
+import argparse
+import json
+import timeit
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from backend.app.schemas import ScreeningDesignOut, TournamentDesignOut, TournamentTasksOut
+from backend.benchmarks.fixtures import prefetch_payload, screening_payload, tournament_payload
+
+CASES = [
+    ("tournament task (4 x 10 attributes)", TypeAdapter(TournamentDesignOut), tournament_payload()),
+    ("screening design (15 x 10 attributes)", TypeAdapter(List[ScreeningDesignOut]), screening_payload()),
+    ("tournament prefetch (20 tasks)", TypeAdapter(TournamentTasksOut), prefetch_payload()),
+]
+
+
+def default_path(adapter: TypeAdapter, payload) -> bytes:
+    validated = adapter.validate_python(payload)
+    return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+
+def trusted_path(adapter: TypeAdapter, payload) -> bytes:
+    return ORJSONResponse(payload).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=2000, help="iterations per case")
+    args = parser.parse_args()
+
+    print(f"{'payload':40} {'bytes':>7} {'default us':>11} {'orjson us':>10} {'speedup':>8}")
+    for name, adapter, payload in CASES:
+        assert json.loads(default_path(adapter, payload)) == json.loads(trusted_path(adapter, payload))
+        default = min(timeit.repeat(lambda: default_path(adapter, payload), number=args.number, repeat=3))
+        trusted = min(timeit.repeat(lambda: trusted_path(adapter, payload), number=args.number, repeat=3))
+        size = len(trusted_path(adapter, payload))
+        print(
+            f"{name:40} {size:7d} {default / args.number * 1e6:11.1f} "
+            f"{trusted / args.number * 1e6:10.1f} {default / trusted:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
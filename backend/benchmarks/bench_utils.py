@@ -0,0 +1,251 @@
+"""
+Micro-benchmarks for the design and estimation functions in ``utils.py``.
+
+Each function is timed (median of ``ROUNDS`` runs, in microseconds per call,
+with the median absolute deviation of the runs as its noise) and its peak
+memory allocation measured with ``tracemalloc``, for design sizes
+from three 2-level attributes up to the 10-attribute smartphone study.
+Functions taking a list of profiles get the full factorial, or a fixed
+random sample of ``MAX_PROFILES`` profiles for larger designs. Each round
+times every benchmark once, so a slow phase of a shared machine shows up
+as noise of every benchmark rather than shifting the few timed during it.
+
+Results are written as JSON; ``compare`` checks a run against a baseline
+and exits with status 1 when any function got slower (or allocated more)
+by more than the threshold. A slowdown only counts when it also exceeds
+``--min-delta-us`` and the combined noise of both runs, since a few
+microseconds of jitter are tens of percent of the fastest functions.
+Timings depend on the machine, so compare runs made on the same quiet
+machine and re-record ``baselines/bench_utils.json`` with
+``--save-baseline`` when the reference machine changes.
+
+Usage::
+
+    python -m backend.benchmarks.bench_utils run [--size NAME ...] [--output FILE]
+        [--save-baseline] [--compare [BASELINE]] [--threshold 0.25] [--min-delta-us 5]
+        [--memory-threshold 0.1]
+    python -m backend.benchmarks.bench_utils compare BASELINE CURRENT [--threshold 0.25] [--min-delta-us 5]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.app import utils
+from backend.benchmarks.fixtures import SMARTPHONE_ATTRIBUTES
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "bench_utils.json")
+
+# Largest profile list handed to create_design_matrix and generate_choice_sets
+MAX_PROFILES = 512
+
+# Timed runs of each benchmark, interleaved across all of them
+ROUNDS = 7
+# A slowdown must exceed this many times the summed noise of both runs
+NOISE_FACTOR = 3
+
+
+def _design(n_attributes: int, n_levels: int) -> Dict[str, List[str]]:
+    return {f"attr{a}": [f"level{l}" for l in range(n_levels)] for a in range(n_attributes)}
+
+
+SIZES: Dict[str, Dict[str, List[Any]]] = {
+    "3x2": _design(3, 2),
+    "4x3": _design(4, 3),
+    "6x3": _design(6, 3),
+    "6x5": _design(6, 5),
+    "smartphone": SMARTPHONE_ATTRIBUTES,
+}
+
+
+def _inputs(attributes: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """Deterministic inputs for one design size."""
+    random.seed(0)
+    profiles = utils.full_factorial(attributes)
+    if len(profiles) > MAX_PROFILES:
+        profiles = random.sample(profiles, MAX_PROFILES)
+    screening = utils.generate_screening_matrix(attributes)
+    responses = [i % 2 == 0 for i in range(len(screening))]
+    utilities = utils.estimate_initial_utilities(responses, screening)
+    return {
+        "attributes": attributes,
+        "profiles": profiles,
+        "screening": screening,
+        "responses": responses,
+        "utilities": utilities,
+        "choice": screening[0],
+    }
+
+
+CASES: Dict[str, Callable[[Dict[str, Any]], Callable[[], Any]]] = {
+    "generate_screening_matrix": lambda d: lambda: utils.generate_screening_matrix(d["attributes"]),
+    "create_design_matrix": lambda d: lambda: utils.create_design_matrix(d["profiles"]),
+    "generate_choice_sets": lambda d: lambda: utils.generate_choice_sets(d["profiles"], n_options=3, n_sets=1),
+    "estimate_initial_utilities": lambda d: lambda: utils.estimate_initial_utilities(d["responses"], d["screening"]),
+    "adaptive_update": lambda d: lambda: utils.adaptive_update(d["utilities"], d["choice"]),
+}
+
+
+def peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak allocated bytes of one call."""
+    random.seed(0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(sizes: List[str], rounds: int = ROUNDS) -> Dict[str, Any]:
+    timers: Dict[str, Tuple[timeit.Timer, int]] = {}
+    results = {}
+    for size in sizes:
+        inputs = _inputs(SIZES[size])
+        for name, case in CASES.items():
+            fn = case(inputs)
+            timer = timeit.Timer(fn, setup=lambda: random.seed(0))
+            number, _ = timer.autorange()
+            timers[f"{name}[{size}]"] = (timer, number)
+            results[f"{name}[{size}]"] = {"peak_bytes": peak_memory(fn)}
+
+    samples: Dict[str, List[float]] = {key: [] for key in timers}
+    for i in range(rounds):
+        print(f"round {i + 1}/{rounds}", file=sys.stderr, flush=True)
+        for key, (timer, number) in timers.items():
+            samples[key].append(timer.timeit(number) / number * 1e6)
+
+    for key, times in samples.items():
+        us = statistics.median(times)
+        noise = statistics.median(abs(t - us) for t in times)
+        results[key].update(us_per_call=round(us, 3), us_noise=round(noise, 3))
+        print(f"{key:40} {us:12.1f} us ±{noise:8.1f} {results[key]['peak_bytes'] / 1024:10.1f} KiB", flush=True)
+    return {"meta": _meta(), "results": results}
+
+
+def _meta() -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float,
+    memory_threshold: Optional[float] = None,
+    min_delta_us: float = 5.0,
+) -> bool:
+    """
+    Print the change of every benchmark against ``baseline``.
+
+    Args:
+        baseline: Earlier report
+        current: New report
+        threshold: Allowed relative slowdown (0.25 = 25%)
+        memory_threshold: Allowed relative growth in peak memory (default: ``threshold``)
+        min_delta_us: Slowdowns of at most this many microseconds per call
+            are never flagged; neither are those within ``NOISE_FACTOR``
+            times the summed noise of both runs
+
+    Returns:
+        True when nothing regressed beyond the thresholds
+    """
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    if baseline["meta"].get("machine") != current["meta"].get("machine"):
+        print(f"warning: baseline was recorded on {baseline['meta'].get('machine')!r}", file=sys.stderr)
+
+    ok = True
+    print(f"{'benchmark':40} {'time':>9} {'memory':>9}")
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:40} {'new':>9}")
+            continue
+        time_change = new["us_per_call"] / old["us_per_call"] - 1 if old["us_per_call"] else 0.0
+        memory_change = new["peak_bytes"] / old["peak_bytes"] - 1 if old["peak_bytes"] else 0.0
+        # Reports from before noise was recorded have none
+        band = max(min_delta_us, NOISE_FACTOR * (old.get("us_noise", 0.0) + new.get("us_noise", 0.0)))
+        flags = []
+        if time_change > threshold and new["us_per_call"] - old["us_per_call"] > band:
+            flags.append("SLOWER")
+        if memory_change > memory_threshold:
+            flags.append("MORE MEMORY")
+        ok = ok and not flags
+        print(f"{name:40} {time_change:+9.1%} {memory_change:+9.1%} {' '.join(flags)}")
+    return ok
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write(report: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Report written to {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--size", action="append", choices=list(SIZES), help="design size (repeatable; default: all)")
+    run_parser.add_argument("--output", help="write the JSON report to this file")
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"write the report to {os.path.relpath(BASELINE_PATH)}")
+    run_parser.add_argument("--compare", nargs="?", const=BASELINE_PATH, help="compare with a baseline (default: the saved one)")
+    run_parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (default: 0.25)")
+    run_parser.add_argument("--min-delta-us", type=float, default=5.0, help="ignored absolute slowdown per call (default: 5)")
+    run_parser.add_argument("--memory-threshold", type=float, default=0.1, help="allowed relative memory growth (default: 0.1)")
+
+    compare_parser = commands.add_parser("compare", help="compare two reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (default: 0.25)")
+    compare_parser.add_argument("--min-delta-us", type=float, default=5.0, help="ignored absolute slowdown per call (default: 5)")
+    compare_parser.add_argument("--memory-threshold", type=float, default=0.1, help="allowed relative memory growth (default: 0.1)")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        ok = compare(_load(args.baseline), _load(args.current), args.threshold, args.memory_threshold, args.min_delta_us)
+        sys.exit(0 if ok else 1)
+
+    report = run(args.size or list(SIZES))
+    if args.output:
+        _write(report, args.output)
+    if args.save_baseline:
+        _write(report, BASELINE_PATH)
+    if args.compare:
+        print()
+        if not compare(_load(args.compare), report, args.threshold, args.memory_threshold, args.min_delta_us):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Realistic study configurations and payloads shared by the benchmarks.
+"""
+
+from typing import Any, Dict, List
+
+from backend.app import utils
+
+# The 10-attribute smartphone study used by test_acbc_survey_slow.ps1
+SMARTPHONE_ATTRIBUTES: Dict[str, List[Any]] = {
+    "brand": ["Apple", "Samsung", "Google", "OnePlus", "Xiaomi"],
+    "price": ["499", "699", "899", "1099"],
+    "screen_size": ['5.8"', '6.1"', '6.4"', '6.7"'],
+    "battery_life": ["Up to 12 hrs", "Up to 18 hrs", "Up to 24 hrs"],
+    "camera_quality": ["Dual Lens (12MP)", "Triple Lens (48MP)", "Quad Lens (108MP)"],
+    "storage_capacity": ["64 GB", "128 GB", "256 GB", "512 GB"],
+    "5g_support": ["No", "Yes"],
+    "wireless_charging": ["No", "Yes"],
+    "water_resistance": ["No", "IP67 (1m)", "IP68 (1.5m)"],
+    "operating_system": ["iOS", "Android"],
+}
+
+
+def tournament_payload(task_number: int = 1, n_concepts: int = 4) -> Dict[str, Any]:
+    """``GET /api/tournament/choice`` body with ``n_concepts`` 10-attribute concepts."""
+    profiles = utils.full_factorial({k: v[:2] for k, v in SMARTPHONE_ATTRIBUTES.items()})
+    step = len(profiles) // n_concepts
+    concepts = [{"id": i, "attributes": profiles[i * step]} for i in range(n_concepts)]
+    return {"task_number": task_number, "concepts": concepts}
+
+
+def screening_payload(n_concepts: int = 15) -> List[Dict[str, Any]]:
+    """``GET /api/screening/design`` body with ``n_concepts`` 10-attribute concepts."""
+    concepts = utils.generate_screening_matrix(SMARTPHONE_ATTRIBUTES, n_concepts)
+    return [
+        {"id": 1000 + i, "concept": concept, "position": i + 1, "response": None}
+        for i, concept in enumerate(concepts)
+    ]
+
+
+def prefetch_payload(n_tasks: int = 20) -> Dict[str, Any]:
+    """``GET /api/tournament/tasks`` body with ``n_tasks`` tournament tasks."""
+    return {
+        "session_id": "3fa6407f-9fac-47ef-b536-699c46eaaf9e",
+        "total_tasks": n_tasks,
+        "tasks": [tournament_payload(n) for n in range(1, n_tasks + 1)],
+    }
@@ -0,0 +1,319 @@
+"""
+End-to-end respondent-flow load test.
+
+Simulates respondents going through the whole survey concurrently:
+BYO configuration → screening design → screening responses → N tournament
+tasks (design, then choice). Each respondent answers at random.
+
+By default the app runs in-process (ASGI, with its lifespan) against a
+fresh SQLite database; ``--database-url`` points it at another database
+(e.g. a local Postgres), and ``--url`` targets a running server instead.
+In-process, client and server share one event loop, so absolute latencies
+are higher than over the network; compare runs made the same way. SQLite
+serialises writes, so against the temporary SQLite database the default
+concurrency is ``SQLITE_CONCURRENCY`` and writers wait up to
+``SQLITE_BUSY_TIMEOUT`` seconds for the lock; higher concurrency there
+ends in "database is locked" errors. Load-test hundreds or thousands of
+concurrent respondents against Postgres (``--database-url`` or ``--url``).
+
+The report lists throughput, latency percentiles and status codes per
+endpoint, and is written as JSON with ``--output`` so two versions can be
+compared with ``--compare``. Requires ``httpx`` (``pip install httpx``).
+
+Usage::
+
+    python -m backend.benchmarks.loadtest [--respondents N] [--concurrency C]
+        [--tasks T] [--study small|smartphone] [--url URL | --database-url URL]
+        [--output report.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from backend.benchmarks.fixtures import SMARTPHONE_ATTRIBUTES
+
+STUDIES: Dict[str, Dict[str, List[Any]]] = {
+    "small": {"brand": ["Apple", "Samsung", "Google"], "storage": ["64GB", "128GB", "256GB"], "price": ["$499", "$699"]},
+    "smartphone": SMARTPHONE_ATTRIBUTES,
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Default respondents in flight against the temporary SQLite database, and
+# against Postgres or a running server
+SQLITE_CONCURRENCY = 10
+DEFAULT_CONCURRENCY = 50
+# Seconds a SQLite writer waits for the database lock
+SQLITE_BUSY_TIMEOUT = 30
+
+# Longest wait honoured from a Retry-After header, and retries per request
+_MAX_RETRY_AFTER = 5.0
+_MAX_RETRIES = 5
+
+
+class Recorder:
+    """Latencies and status codes per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.flows: List[float] = []
+        self.failed = 0
+
+    def record(self, endpoint: str, status: int, seconds: float) -> None:
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+
+class RespondentFailed(Exception):
+    pass
+
+
+async def _request(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request, honouring 503 Retry-After and following 202 design jobs."""
+    for _ in range(_MAX_RETRIES):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        recorder.record(endpoint, response.status_code, time.perf_counter() - started)
+        if response.status_code == 503 and "retry-after" in response.headers:
+            await asyncio.sleep(min(float(response.headers["retry-after"]), _MAX_RETRY_AFTER))
+            continue
+        if response.status_code == 202 and "location" in response.headers:
+            # The design moved to a background job; poll its result instead
+            endpoint, method, url, kwargs = "job_result", "GET", response.headers["location"] + "/result", {}
+            await asyncio.sleep(min(float(response.headers.get("retry-after", 1)), _MAX_RETRY_AFTER))
+            continue
+        if response.status_code >= 400:
+            raise RespondentFailed(f"{endpoint}: {response.status_code} {response.text[:200]}")
+        return response
+    raise RespondentFailed(f"{endpoint}: gave up after {_MAX_RETRIES} attempts")
+
+
+async def respondent(client: httpx.AsyncClient, recorder: Recorder, study: Dict[str, List[Any]], tasks: int, rng: random.Random) -> None:
+    """One respondent's survey, from BYO configuration to the last tournament choice."""
+    response = await _request(
+        client, recorder, "byo_config", "POST", "/api/byo-config",
+        json={"session_id": None, "selected_attributes": study},
+    )
+    sid = response.json()["session_id"]
+
+    response = await _request(client, recorder, "screening_design", "GET", "/api/screening/design", params={"session_id": sid})
+    n_screening = len(response.json())
+    await _request(
+        client, recorder, "screening_responses", "POST", "/api/screening/responses",
+        json={"session_id": sid, "responses": [rng.random() < 0.5 for _ in range(n_screening)]},
+    )
+
+    for task_number in range(1, tasks + 1):
+        response = await _request(
+            client, recorder, "tournament_choice", "GET", "/api/tournament/choice",
+            params={"session_id": sid, "task_number": task_number},
+        )
+        concepts = response.json()["concepts"]
+        await _request(
+            client, recorder, "choice_response", "POST", "/api/tournament/choice-response",
+            json={"session_id": sid, "task_number": task_number, "selected_concept_id": rng.randrange(len(concepts))},
+        )
+
+
+async def run(client: httpx.AsyncClient, respondents: int, concurrency: int, study, tasks: int, seed: int) -> Recorder:
+    """Run ``respondents`` flows, at most ``concurrency`` at a time."""
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await respondent(client, recorder, study, tasks, random.Random(seed + i))
+            except (RespondentFailed, httpx.HTTPError) as e:
+                recorder.failed += 1
+                if recorder.failed <= 5:
+                    print(f"respondent {i} failed: {e}", file=sys.stderr)
+                return
+            recorder.flows.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(respondents)))
+    return recorder
+
+
+def _latency_summary(seconds: List[float]) -> Dict[str, float]:
+    if not seconds:
+        return {}
+    ms = np.asarray(seconds) * 1000
+    summary = {"mean": float(ms.mean())}
+    summary.update({f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES})
+    summary["max"] = float(ms.max())
+    return {key: round(value, 2) for key, value in summary.items()}
+
+
+def build_report(recorder: Recorder, duration: float, meta: Dict[str, Any]) -> Dict[str, Any]:
+    endpoints = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        statuses = recorder.statuses[endpoint]
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "errors": sum(n for status, n in statuses.items() if status >= 400),
+            "status": {str(status): n for status, n in sorted(statuses.items())},
+            "throughput_rps": round(len(latencies) / duration, 2),
+            "latency_ms": _latency_summary(latencies),
+        }
+    total = sum(len(latencies) for latencies in recorder.latencies.values())
+    return {
+        "meta": dict(meta, duration_s=round(duration, 2)),
+        "respondents": {
+            "completed": len(recorder.flows),
+            "failed": recorder.failed,
+            "throughput_per_s": round(len(recorder.flows) / duration, 2),
+            "flow_latency_ms": _latency_summary(recorder.flows),
+        },
+        "total": {"requests": total, "throughput_rps": round(total / duration, 2)},
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    meta, flows = report["meta"], report["respondents"]
+    print(
+        f"{flows['completed']} respondents ({flows['failed']} failed) in {meta['duration_s']}s "
+        f"against {meta['target']}, concurrency {meta['concurrency']}, {meta['tasks']} tournament tasks"
+    )
+    header = " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES)
+    print(f"\n{'endpoint':20} {'requests':>8} {'errors':>6} {'req/s':>8} {'mean':>8} {header} {'max':>8}  (ms)")
+    rows = list(report["endpoints"].items()) + [("respondent flow", {
+        "requests": flows["completed"], "errors": flows["failed"],
+        "throughput_rps": flows["throughput_per_s"], "latency_ms": flows["flow_latency_ms"],
+    })]
+    for endpoint, stats in rows:
+        latency = stats["latency_ms"]
+        values = " ".join(f"{latency.get(f'p{p}', 0):8.1f}" for p in PERCENTILES)
+        print(
+            f"{endpoint:20} {stats['requests']:8d} {stats['errors']:6d} {stats['throughput_rps']:8.1f} "
+            f"{latency.get('mean', 0):8.1f} {values} {latency.get('max', 0):8.1f}"
+        )
+
+
+def print_comparison(baseline: Dict[str, Any], report: Dict[str, Any]) -> None:
+    """Per-endpoint change in throughput and p50/p95 latency against ``baseline``."""
+
+    def change(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+7.1f}%" if old else "     n/a"
+
+    print(f"\nCompared with {baseline['meta'].get('git_revision') or 'baseline'} ({baseline['meta'].get('started')}):")
+    print(f"{'endpoint':20} {'req/s':>9} {'p50':>9} {'p95':>9}")
+    for endpoint, stats in report["endpoints"].items():
+        old = baseline["endpoints"].get(endpoint)
+        if old is None:
+            print(f"{endpoint:20} (new)")
+            continue
+        print(
+            f"{endpoint:20} {change(old['throughput_rps'], stats['throughput_rps'])} "
+            f"{change(old['latency_ms'].get('p50', 0), stats['latency_ms'].get('p50', 0))} "
+            f"{change(old['latency_ms'].get('p95', 0), stats['latency_ms'].get('p95', 0))}"
+        )
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@asynccontextmanager
+async def _client(url: Optional[str], database_url: Optional[str], concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(60.0)
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+            yield client
+        return
+
+    # The database URL is read when the app is imported
+    workdir = None
+    if not database_url:
+        workdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite+aiosqlite:///{os.path.join(workdir.name, 'loadtest.db')}?timeout={SQLITE_BUSY_TIMEOUT}"
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["LOCAL_DATABASE_URL"] = database_url
+    from backend.app.main import app
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits, timeout=timeout) as client:
+                yield client
+    finally:
+        if workdir is not None:
+            workdir.cleanup()
+
+
+async def _main(args) -> Dict[str, Any]:
+    study = STUDIES[args.study]
+    target = args.url or f"in-process ({args.database_url or 'temporary SQLite'})"
+    meta = {
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "target": target,
+        "respondents": args.respondents,
+        "concurrency": args.concurrency,
+        "tasks": args.tasks,
+        "study": args.study,
+        "seed": args.seed,
+    }
+    async with _client(args.url, args.database_url, args.concurrency) as client:
+        started = time.perf_counter()
+        recorder = await run(client, args.respondents, args.concurrency, study, args.tasks, args.seed)
+        duration = time.perf_counter() - started
+    return build_report(recorder, duration, meta)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--respondents", type=int, default=200, help="respondents to simulate")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help=f"respondents in flight at once (default: {SQLITE_CONCURRENCY} against the temporary SQLite, else {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument("--tasks", type=int, default=3, help="tournament tasks per respondent")
+    parser.add_argument("--study", choices=sorted(STUDIES), default="small", help="BYO configuration used")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the respondents' answers")
+    parser.add_argument("--url", help="base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--database-url", help="database for the in-process app (default: temporary SQLite)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare with")
+    args = parser.parse_args()
+    if args.concurrency is None:
+        args.concurrency = DEFAULT_CONCURRENCY if args.url or args.database_url else SQLITE_CONCURRENCY
+
+    report = asyncio.run(_main(args))
+    print_report(report)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Database statement budgets for every API route.
+
+Runs a respondent through every route in ``backend/app/routers`` against
+the in-process app and a temporary SQLite database, counts the statements
+each request executes (``query_stats.count_queries``), and exits with
+status 1 when a route exceeds its budget in ``BUDGETS`` or has no budget
+at all, so a new route or an extra round trip cannot slip in unnoticed.
+Counts are taken on a warm worker (session state cached), the common case
+in production.
+
+Usage::
+
+    python -m backend.benchmarks.query_budget [--verbose]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+# (method, route path) -> most statements one request may execute
+BUDGETS: Dict[Tuple[str, str], int] = {
+    ("POST", "/api/byo-config"): 2,
+    ("POST", "/api/byo-config/batch"): 2,
+    ("GET", "/api/byo-config"): 2,
+    ("GET", "/api/screening/design"): 1,
+    ("POST", "/api/screening/responses"): 3,
+    # Generated tasks are re-read after insert so the first stored row wins
+    ("GET", "/api/tournament/choice"): 3,
+    ("GET", "/api/tournament/tasks"): 3,
+    # Choices read (and lock) the utilities they update, never from the session cache
+    ("POST", "/api/tournament/choice-response"): 4,
+    ("POST", "/api/tournament/choice-responses"): 4,
+    ("POST", "/api/tournament/choice-and-next"): 4,
+    ("POST", "/api/ingest/respondents"): 3,
+    ("POST", "/api/jobs"): 1,
+    ("GET", "/api/jobs/{job_id}"): 1,
+    ("GET", "/api/jobs/{job_id}/result"): 1,
+}
+
+_STUDY = {"brand": ["Apple", "Samsung", "Google"], "storage": ["64GB", "128GB", "256GB"], "price": ["$499", "$699"]}
+
+
+class _Client:
+    """Sends requests and records the statements each one executed."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.rows: List[Dict[str, Any]] = []
+
+    async def __call__(self, method: str, route: str, url: str, **kwargs) -> httpx.Response:
+        from backend.app.query_stats import count_queries
+
+        with count_queries() as stats:
+            response = await self.client.request(method, url, **kwargs)
+        self.rows.append({
+            "method": method,
+            "route": route,
+            "status": response.status_code,
+            "statements": stats.statements,
+            "sql": stats.sql,
+            "budget": BUDGETS.get((method, route)),
+        })
+        return response
+
+
+async def _respondent(call: _Client) -> None:
+    """One request to every route, in survey order."""
+    response = await call("POST", "/api/byo-config", "/api/byo-config", json={"session_id": None, "selected_attributes": _STUDY})
+    sid = response.json()["session_id"]
+    await call("POST", "/api/byo-config/batch", "/api/byo-config/batch", json={"config": {"session_id": None, "selected_attributes": _STUDY}, "count": 1})
+    await call("GET", "/api/byo-config", "/api/byo-config", params={"selected_attributes": json.dumps(_STUDY)})
+
+    response = await call("GET", "/api/screening/design", "/api/screening/design", params={"session_id": sid})
+    responses = [i % 2 == 0 for i in range(len(response.json()))]
+    await call("POST", "/api/screening/responses", "/api/screening/responses", json={"session_id": sid, "responses": responses})
+
+    await call("GET", "/api/tournament/choice", "/api/tournament/choice", params={"session_id": sid, "task_number": 1})
+    await call("GET", "/api/tournament/tasks", "/api/tournament/tasks", params={"session_id": sid})
+    await call(
+        "POST", "/api/tournament/choice-response", "/api/tournament/choice-response",
+        json={"session_id": sid, "task_number": 1, "selected_concept_id": 0},
+    )
+    await call(
+        "POST", "/api/tournament/choice-responses", "/api/tournament/choice-responses",
+        json={"session_id": sid, "choices": [{"task_number": 2, "selected_concept_id": 0}, {"task_number": 3, "selected_concept_id": 1}]},
+    )
+    await call(
+        "POST", "/api/tournament/choice-and-next", "/api/tournament/choice-and-next",
+        json={"session_id": sid, "task_number": 4, "selected_concept_id": 0},
+    )
+
+    record = {
+        "selected_attributes": _STUDY,
+        "screening": [{"concept": {"brand": "Apple", "storage": "64GB", "price": "$499"}, "response": True}],
+        "tournament": [],
+    }
+    await call("POST", "/api/ingest/respondents", "/api/ingest/respondents", content=json.dumps(record) + "\n")
+
+    response = await call("POST", "/api/jobs", "/api/jobs", json={"kind": "reestimate", "session_id": sid})
+    job_url = response.headers["location"]
+    await call("GET", "/api/jobs/{job_id}", job_url)
+    await call("GET", "/api/jobs/{job_id}/result", job_url + "/result")
+
+
+def _api_routes(app) -> List[Tuple[str, str]]:
+    return sorted(
+        (method, route.path)
+        for route in app.routes
+        if getattr(route, "path", "").startswith("/api/")
+        for method in getattr(route, "methods", ())
+    )
+
+
+async def measure():
+    """Run the requests; returns ``(rows, routes of the app)``."""
+    workdir = tempfile.TemporaryDirectory()
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["LOCAL_DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir.name, 'budget.db')}"
+    # Background work would add its statements to the request that started it
+    os.environ["SPECULATIVE_PRECOMPUTE"] = "false"
+    os.environ["STARTUP_WARMUP"] = "false"
+    from backend.app.main import app
+
+    try:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://budget") as client:
+                call = _Client(client)
+                await _respondent(call)
+    finally:
+        workdir.cleanup()
+    return call.rows, _api_routes(app)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--verbose", action="store_true", help="list every request, not only failures")
+    args = parser.parse_args()
+
+    rows, routes = asyncio.run(measure())
+    failures = []
+    print(f"{'method':6} {'route':36} {'status':>6} {'stmts':>5} {'budget':>6}")
+    for row in rows:
+        problem = None
+        if row["status"] >= 400:
+            problem = f"answered {row['status']}"
+        elif row["budget"] is None:
+            problem = "no budget"
+        elif row["statements"] > row["budget"]:
+            problem = "over budget"
+        if problem:
+            failures.append(f"{row['method']} {row['route']}: {problem}")
+        if problem or args.verbose:
+            budget = "-" if row["budget"] is None else row["budget"]
+            print(f"{row['method']:6} {row['route']:36} {row['status']:6d} {row['statements']:5d} {budget:>6} {problem or ''}")
+            if problem == "over budget":
+                for sql in row["sql"]:
+                    print(f"       {' '.join(sql.split())[:120]}")
+
+    exercised = {(row["method"], row["route"]) for row in rows}
+    for method, path in routes:
+        if (method, path) not in exercised:
+            failures.append(f"{method} {path}: not exercised by query_budget.py")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+    print(f"\nAll {len(routes)} routes within their statement budgets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Simulated respondents with known part-worths.
+
+A ``SimulatedRespondent`` has true level utilities (zero-centred within
+each attribute) and answers the survey through logit draws: a screening
+concept is accepted with a binary logit on its total utility, and a
+tournament concept is chosen with a multinomial logit (MNL) over the
+concepts shown. ``simulate_survey`` runs a respondent through the same
+``utils`` functions the API uses, and ``recovery`` scores the estimated
+utilities against the true ones.
+
+Estimated utilities are acceptance rates adjusted by tournament choices,
+not logit part-worths, so recovery is measured on scale-free terms:
+
+- ``correlation``: Pearson correlation of true and estimated utilities,
+  both centred within each attribute
+- ``rmse``: RMSE of the centred estimates after the least-squares scale
+  that best maps them onto the true utilities
+- ``hit_rate``: share of random holdout choice sets where the concept
+  with the highest estimated utility is also the true best one
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.app import utils
+
+
+class SimulatedRespondent:
+    """
+    Respondent answering with logit draws from true utilities.
+
+    Args:
+        attributes: Study design (attribute -> levels)
+        rng: Random generator for the utilities and all answers
+        scale: Standard deviation of the true level utilities
+        threshold: Total utility at which a screening concept is accepted
+            half of the time
+    """
+
+    def __init__(self, attributes: Dict[str, List[Any]], rng: np.random.Generator, scale: float = 1.0, threshold: float = 0.0):
+        self.rng = rng
+        self.threshold = threshold
+        self.utilities: Dict[str, Dict[Any, float]] = {}
+        for attr, levels in attributes.items():
+            draws = rng.normal(0.0, scale, len(levels))
+            self.utilities[attr] = dict(zip(levels, draws - draws.mean()))
+
+    def utility(self, concept: Dict[str, Any]) -> float:
+        return float(sum(self.utilities[attr].get(level, 0.0) for attr, level in concept.items()))
+
+    def accepts(self, concept: Dict[str, Any]) -> bool:
+        """Screening answer: binary logit on the concept's utility."""
+        p = 1.0 / (1.0 + np.exp(self.threshold - self.utility(concept)))
+        return bool(self.rng.random() < p)
+
+    def choose(self, concepts: List[Dict[str, Any]]) -> int:
+        """Tournament answer: index drawn from the MNL choice probabilities."""
+        u = np.array([self.utility(c) for c in concepts])
+        p = np.exp(u - u.max())
+        return int(self.rng.choice(len(concepts), p=p / p.sum()))
+
+
+def simulate_survey(
+    respondent: SimulatedRespondent,
+    byo: Dict[str, List[Any]],
+    algorithm: str = "exchange",
+    n_tasks: Optional[int] = None,
+    n_options: int = 3,
+) -> Dict[str, Any]:
+    """
+    Run one respondent through screening and the tournament.
+
+    Args:
+        respondent: The simulated respondent
+        byo: The respondent's BYO configuration
+        algorithm: Tournament design algorithm (one of ``utils.TOURNAMENT_ALGORITHMS``)
+        n_tasks: Tournament tasks (default: the number the API plans)
+        n_options: Concepts requested per tournament task
+
+    Returns:
+        ``{"utilities", "tasks", "design_seconds", "estimation_seconds"}``
+    """
+    design_seconds = estimation_seconds = 0.0
+
+    started = time.perf_counter()
+    screening = utils.generate_screening_matrix(byo)
+    design_seconds += time.perf_counter() - started
+    responses = [respondent.accepts(concept) for concept in screening]
+
+    started = time.perf_counter()
+    utilities = utils.estimate_initial_utilities(responses, screening)
+    estimation_seconds += time.perf_counter() - started
+
+    if n_tasks is None:
+        n_tasks = utils.calculate_optimal_tournament_tasks(utils.filter_design_space_for_tournament(utilities, byo))
+
+    chosen: List[Dict[str, Any]] = []
+    for task_number in range(1, n_tasks + 1):
+        started = time.perf_counter()
+        concepts = utils.generate_tournament_set(utilities, byo, task_number, n_options, algorithm=algorithm)
+        design_seconds += time.perf_counter() - started
+        chosen.append(concepts[respondent.choose([c["attributes"] for c in concepts])]["attributes"])
+        # The API updates utilities after every choice and designs the next task from them
+        started = time.perf_counter()
+        utilities = utils.adaptive_update(utilities, chosen[-1])
+        estimation_seconds += time.perf_counter() - started
+
+    return {
+        "utilities": utilities,
+        "tasks": n_tasks,
+        "design_seconds": design_seconds,
+        "estimation_seconds": estimation_seconds,
+    }
+
+
+def _centred(utilities: Dict[str, Dict[Any, float]], attributes: Dict[str, List[Any]]) -> np.ndarray:
+    values = []
+    for attr, levels in attributes.items():
+        level_utils = utilities.get(attr, {})
+        row = np.array([float(level_utils.get(level, 0.0)) for level in levels])
+        values.append(row - row.mean())
+    return np.concatenate(values)
+
+
+def recovery(
+    respondent: SimulatedRespondent,
+    estimated: Dict[str, Dict[str, float]],
+    attributes: Dict[str, List[Any]],
+    holdout_sets: int = 50,
+    holdout_options: int = 3,
+) -> Dict[str, float]:
+    """
+    Score estimated utilities against the respondent's true utilities.
+
+    Returns:
+        ``{"correlation", "rmse", "hit_rate"}`` (see the module docstring)
+    """
+    true = _centred(respondent.utilities, attributes)
+    est = _centred(estimated, attributes)
+    correlation = float(np.corrcoef(true, est)[0, 1]) if est.std() > 0 else 0.0
+    scale = float(est @ true / (est @ est)) if est @ est > 0 else 0.0
+    rmse = float(np.sqrt(np.mean((scale * est - true) ** 2)))
+
+    # Holdout sets use their own generator so every algorithm is scored on the same sets
+    rng = np.random.default_rng(0)
+    hits = 0
+    for _ in range(holdout_sets):
+        concepts = [{attr: levels[rng.integers(len(levels))] for attr, levels in attributes.items()} for _ in range(holdout_options)]
+        true_best = max(range(holdout_options), key=lambda i: respondent.utility(concepts[i]))
+        est_best = max(
+            range(holdout_options),
+            key=lambda i: sum(float(estimated.get(attr, {}).get(level, 0.0)) for attr, level in concepts[i].items()),
+        )
+        hits += true_best == est_best
+    return {"correlation": correlation, "rmse": rmse, "hit_rate": hits / holdout_sets}